@@ -0,0 +1,144 @@
+from collections import defaultdict
+from itertools import islice
+from typing import NamedTuple
+import csv
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+
+FARES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fares.csv")
+"""CSV with destination, price and semicolon separated aliases columns"""
+
+RELOAD_CHECK_SECONDS = 1.0
+"""How often lookups check whether the fare file changed on disk"""
+
+FUZZY_THRESHOLD = 0.6
+"""Minimum trigram Dice similarity for a misspelled city to match"""
+
+FUZZY_MARGIN = 0.1
+"""How far the best fuzzy match must score above the best match for a different city"""
+
+MIN_FUZZY_LENGTH = 4
+"""Names shorter than this, like the "ber" and "par" codes, only match exactly"""
+
+MAX_CANDIDATES = 1000
+"""Fuzzy lookups score at most this many names, keeping misspellings cheap on very large tables"""
+
+
+class Fare(NamedTuple):
+    city: str
+    price: str
+
+
+def normalize_city(city: str) -> str:
+    """Lowercase, strip accents and punctuation so "Hồ Chí Minh City" and "ho chi minh city" match"""
+    city = unicodedata.normalize("NFKD", city).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.findall(r"[a-z0-9]+", city.lower()))
+
+
+def trigrams(name: str) -> set[str]:
+    padded = f"  {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class FareIndex:
+    """Immutable lookup structures for one version of the fare table"""
+
+    def __init__(self, rows):
+        self.names = {}
+        self.grams = {}
+        self.postings = defaultdict(list)
+        for city, price, aliases in rows:
+            fare = Fare(city, price)
+            for name in [city, *aliases]:
+                name = normalize_city(name)
+                if name and name not in self.names:
+                    self.names[name] = fare
+                    if len(name) < MIN_FUZZY_LENGTH:
+                        continue
+                    self.grams[name] = grams = trigrams(name)
+                    for gram in grams:
+                        self.postings[gram].append(name)
+
+    def lookup(self, city: str) -> Fare | None:
+        name = normalize_city(city)
+        if name in self.names:
+            return self.names[name]
+        query = trigrams(name)
+        # A match needs at least `needed` shared trigrams, so it must contain one of the
+        # len(query) - needed + 1 rarest ones; the common trigrams never have to be scanned
+        needed = math.ceil(FUZZY_THRESHOLD * len(query) / (2 - FUZZY_THRESHOLD))
+        rarest = sorted(query, key=lambda gram: len(self.postings.get(gram, ())))
+        candidates = set()
+        for gram in rarest[: len(query) - needed + 1]:
+            candidates.update(islice(self.postings.get(gram, ()), MAX_CANDIDATES - len(candidates)))
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+        scores = {}
+        for candidate in candidates:
+            if candidate in name:
+                # a known name plus more is another place: Parish, Londonderry, New London
+                return None
+            grams = self.grams[candidate]
+            score = 2 * len(query & grams) / (len(query) + len(grams))
+            fare = self.names[candidate]
+            scores[fare] = max(score, scores.get(fare, 0.0))
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < FUZZY_THRESHOLD:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < FUZZY_MARGIN:
+            return None
+        return ranked[0][0]
+
+
+class FareTable:
+    """Fare lookups against a CSV file that is reloaded when it changes, falling back to a builtin table"""
+
+    def __init__(self, path: str = FARES_PATH, fallback: dict | None = None):
+        self.path = path
+        self.fallback = fallback or {}
+        self.mtime = None
+        self.checked = time.monotonic()
+        self.index = FareIndex((city, price, []) for city, price in self.fallback.items())
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _read(self):
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                aliases = [alias for alias in (row.get("aliases") or "").split(";") if alias.strip()]
+                yield row["destination"], row["price"], aliases
+
+    def _changed(self) -> bool:
+        try:
+            return os.stat(self.path).st_mtime_ns != self.mtime
+        except FileNotFoundError:
+            return False
+
+    def reload(self) -> None:
+        """Rebuild the index if the file changed since it was last read"""
+        with self._lock:
+            if not self._changed():
+                return
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                rows = list(self._read())
+                fallback = [(city, price, []) for city, price in self.fallback.items()]
+                # built aside and swapped in, so lookups never see a half built index
+                self.index = FareIndex(rows + fallback)
+                self.mtime = mtime
+                print(f"Loaded {len(rows)} fares from {self.path}")
+            except (OSError, KeyError, csv.Error) as e:
+                print(f"Could not load fares from {self.path}: {e}")
+
+    def lookup(self, city: str) -> Fare | None:
+        now = time.monotonic()
+        if now - self.checked > RELOAD_CHECK_SECONDS:
+            self.checked = now
+            # large tables take seconds to index, so lookups keep using the old index meanwhile
+            if self._changed() and not self._lock.locked():
+                threading.Thread(target=self.reload, daemon=True).start()
+        return self.index.lookup(city)
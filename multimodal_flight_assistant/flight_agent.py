@@ -1,12 +1,18 @@
 from dotenv import load_dotenv
+import argparse
+import asyncio
 import os
-from openai import OpenAI
+from openai import AsyncOpenAI
 import json
+import math
 import base64
 from io import BytesIO
 from PIL import Image
-import tempfile
+import inspect
 import gradio as gr
+from image_cache import image_cache
+from phrase_cache import phrase_cache
+from fares import Fare, FareTable
 
 INSTRUCTIONS = """
 You are Emily, a cheerful, professional flight ticket assistant. 
@@ -14,43 +20,96 @@ Speak with a clear, positive American accent as you help customers
 find information and book flights.
 """
 
-def artist(city):
-    image_response = openai.images.generate(
-            model="dall-e-3",
-            prompt=f"An image representing a vacation in {city}, showing tourist spots and everything unique about {city}, in a vibrant pop-art style",
-            size="1024x1024",
+IMAGE_MODEL = "dall-e-3"
+IMAGE_SIZE = "1024x1024"
+COLLAGE_SIZE = 1024
+IMAGE_PROMPT = "An image representing a vacation in {city}, showing tourist spots and everything unique about {city}, in a vibrant pop-art style"
+
+# generations in progress, so simultaneous questions about a city share one DALL-E call
+painting = {}
+
+async def artist(city):
+    key = image_cache.key(city, IMAGE_PROMPT, IMAGE_MODEL, IMAGE_SIZE)
+    image = await asyncio.to_thread(image_cache.get, key)
+    if image is not None:
+        return image
+    if key not in painting:
+        painting[key] = asyncio.create_task(paint(city, key))
+        painting[key].add_done_callback(lambda _: painting.pop(key, None))
+    return await asyncio.shield(painting[key])
+
+async def paint(city, key):
+    image_response = await openai.images.generate(
+            model=IMAGE_MODEL,
+            prompt=IMAGE_PROMPT.format(city=city),
+            size=IMAGE_SIZE,
             n=1,
             response_format="b64_json",
         )
     image_base64 = image_response.data[0].b64_json
     image_data = base64.b64decode(image_base64)
-    return Image.open(BytesIO(image_data))
+    image = Image.open(BytesIO(image_data))
+    await asyncio.to_thread(image_cache.put, key, image)
+    return image
+
+async def collage(paintings):
+    """Wait for every destination image and tile them into one picture"""
+    results = await asyncio.gather(*paintings, return_exceptions=True)
+    images = [result for result in results if isinstance(result, Image.Image)]
+    if not images:
+        raise RuntimeError(f"no destination image could be generated: {results[0]}")
+    if len(images) == 1:
+        return images[0]
+    columns = math.ceil(math.sqrt(len(images)))
+    rows = math.ceil(len(images) / columns)
+    tile = COLLAGE_SIZE // columns
+    sheet = Image.new("RGB", (tile * columns, tile * rows), "white")
+    for i, image in enumerate(images):
+        sheet.paste(image.convert("RGB").resize((tile, tile)), ((i % columns) * tile, (i // columns) * tile))
+    return sheet
+
+TTS_MODEL = "gpt-4o-mini-tts"
+TTS_VOICE = "alloy"    # Also, try replacing onyx with alloy
+TTS_CHUNK_SIZE = 4096
 
-def talker(message):
-    response = openai.audio.speech.create(
-      model="gpt-4o-mini-tts",
-      voice="alloy",    # Also, try replacing onyx with alloy
+async def talker(message):
+    """Yield the spoken reply as MP3 chunks while it is synthesized, replaying repeated replies from the cache"""
+    key = phrase_cache.key(message, INSTRUCTIONS, TTS_MODEL, TTS_VOICE)
+    audio = await asyncio.to_thread(phrase_cache.get, key)
+    if audio is not None:
+        yield audio
+        return
+
+    chunks = []
+    async with openai.audio.speech.with_streaming_response.create(
+      model=TTS_MODEL,
+      voice=TTS_VOICE,
       input=message,
       instructions=INSTRUCTIONS,
-    )
-    
-    with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
-        temp_file.write(response.content)
-    
-    return temp_file.name
+      response_format="mp3",
+    ) as response:
+        async for chunk in response.iter_bytes(TTS_CHUNK_SIZE):
+            chunks.append(chunk)
+            yield chunk
+    # only complete recordings are cached, an interrupted stream leaves nothing on disk
+    await asyncio.to_thread(phrase_cache.put, key, b"".join(chunks))
 
 
 ticket_prices = {"london": "$799", "paris": "$899", "tokyo": "$1400", "berlin": "$499", "saigon" : "$1000" }
+"""Builtin fares, used when fares.csv is missing and for cities it doesn't list"""
+
+fares = FareTable(fallback=ticket_prices)
 
-def get_ticket_price(destination_city: str)->float:
+def get_ticket_price(destination_city: str)->Fare:
     """
         use this function to find ticket price to a city
 
         args:
             destination_city: destination city
+
+        returns the matched city and its price, or the city as given with an "Unknown" price
     """
-    city = destination_city.lower()
-    return ticket_prices.get(city, "Unknown")
+    return fares.lookup(destination_city) or Fare(destination_city, "Unknown")
 
 price_function = {
     "name": "get_ticket_price",
@@ -69,22 +128,36 @@ price_function = {
 }
 
 def handle_tool_call(message):
-    tool_call = message.tool_calls[0]
-    arguments = json.loads(tool_call.function.arguments)
-    city = arguments.get('destination_city')
-    price = get_ticket_price(city)
-    response = {
-        "role": "tool",
-        "content": json.dumps({"destination_city": city,"price": price}),
-        "tool_call_id": tool_call.id
-    }
-    return response, city
+    """Answer every tool call in the message; returns the tool messages and the cities they asked about"""
+    responses, cities = [], []
+    for tool_call in message.tool_calls:
+        try:
+            arguments = json.loads(tool_call.function.arguments)
+        except json.JSONDecodeError:
+            arguments = {}
+        city = arguments.get('destination_city')
+        if tool_call.function.name != price_function["name"] or not city:
+            content = {"error": "unsupported tool call"}
+        else:
+            # report the matched city, so aliases and typos also get the right destination image
+            city, price = get_ticket_price(city)
+            content = {"destination_city": city, "price": price}
+            if city not in cities:
+                cities.append(city)
+        responses.append({
+            "role": "tool",
+            "content": json.dumps(content),
+            "tool_call_id": tool_call.id
+        })
+    return responses, cities
 
 tools = [{"type": "function", "function": price_function}]
 
 
 MODEL = 'gpt-4o-mini'
-openai = OpenAI()
+MAX_TOOL_ROUNDS = 3
+"""Completions that may request tools before the model has to answer with what it has"""
+openai = AsyncOpenAI()
 
 
 system_message = "You are Emily, a helpful assistant for an Airline Ticket Agency called VirtualArlineAI. "
@@ -92,29 +165,83 @@ system_message += "Give short, courteous answers, no more than 1 sentence. "
 system_message += "Always be accurate. If you don't know the answer, say so."
 system_message += "In addition, use your available to accomplish the task."
 
-def chat(history):
+async def chat(history):
+    """Yield the text reply as soon as it exists, then the image and the audio chunks as they arrive"""
     messages = [{"role": "system", "content": system_message}] + history
-    response = openai.chat.completions.create(model=MODEL, messages=messages, tools=tools)
-    image = None
-    
-    if response.choices[0].finish_reason=="tool_calls":
+    paintings = {}
+
+    for _ in range(MAX_TOOL_ROUNDS):
+        response = await openai.chat.completions.create(model=MODEL, messages=messages, tools=tools)
+        if response.choices[0].finish_reason != "tool_calls":
+            break
         message = response.choices[0].message
-        response, city = handle_tool_call(message)
+        results, cities = handle_tool_call(message)
         messages.append(message)
-        messages.append(response)
-        image = artist(city)
-        response = openai.chat.completions.create(model=MODEL, messages=messages)
-        
+        messages.extend(results)
+        # paint every destination while the follow-up completion is written
+        for city in cities:
+            if city not in paintings:
+                paintings[city] = asyncio.create_task(artist(city))
+    else:
+        response = await openai.chat.completions.create(model=MODEL, messages=messages)
+
+    image_task = asyncio.create_task(collage(list(paintings.values()))) if paintings else None
+
     reply = response.choices[0].message.content
     history += [{"role":"assistant", "content":reply}]
+    yield history, None if image_task is None else gr.skip(), gr.skip()
+
+    # Comment out or delete the audio relay if you'd rather skip Audio for now..
+    outputs = asyncio.Queue()
+    relays = [asyncio.create_task(relay("audio", talker(reply), outputs))]
+    if image_task is not None:
+        relays.append(asyncio.create_task(relay("image", image_task, outputs)))
+
+    try:
+        finished = 0
+        while finished < len(relays):
+            item = await outputs.get()
+            if item is None:
+                finished += 1
+            elif item[0] == "image":
+                yield gr.skip(), item[1], gr.skip()
+            else:
+                yield gr.skip(), gr.skip(), item[1]
+    finally:
+        # the visitor left or sent another message before the media finished
+        for task in relays + [image_task]:
+            if task is not None:
+                task.cancel()
 
-    # Comment out or delete the next line if you'd rather skip Audio for now..
-    #talker(reply)
-    
-    return history, image, talker(reply)
+
+async def relay(name, source, outputs):
+    """Put everything source produces on the outputs queue, then None to mark it finished"""
+    try:
+        if inspect.isasyncgen(source):
+            async for item in source:
+                await outputs.put((name, item))
+        else:
+            await outputs.put((name, await source))
+    except Exception as e:
+        print(f"{name.capitalize()} generation failed: {e}")
+    finally:
+        outputs.put_nowait(None)
+
+
+async def prewarm():
+    """Render every destination in ticket_prices into the image cache"""
+    results = await asyncio.gather(*(artist(city) for city in ticket_prices), return_exceptions=True)
+    for city, result in zip(ticket_prices, results):
+        print(f"{city}: {'failed - ' + str(result) if isinstance(result, Exception) else 'cached'}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prewarm", action="store_true", help="render all destination images into the cache and exit")
+    if parser.parse_args().prewarm:
+        asyncio.run(prewarm())
+        raise SystemExit
+
     with gr.Blocks() as ui:
         with gr.Row():
             chatbot = gr.Chatbot(height=500, type="messages")
@@ -0,0 +1,106 @@
+from io import BytesIO
+import hashlib
+import json
+import os
+import threading
+import time
+from PIL import Image
+
+IMAGE_CACHE_DIR = "cache/images"
+IMAGE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+"""Least recently used images are deleted once the cache grows past this size"""
+
+IMAGE_FORMAT = "WEBP"
+IMAGE_QUALITY = 90
+
+STALE_TEMP_SECONDS = 60 * 60
+"""Partial writes older than this were abandoned by a crashed or cancelled writer"""
+
+
+def normalize_city(city: str) -> str:
+    return " ".join(city.lower().split())
+
+
+def evict_least_recently_used(directory: str, max_bytes: int) -> int:
+    """Delete the oldest files in directory until it fits in max_bytes; returns how many were deleted"""
+    now = time.time()
+    entries = []
+    for entry in os.scandir(directory):
+        if not entry.is_file():
+            continue
+        stat = entry.stat()
+        if entry.name.endswith(".tmp"):
+            if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                os.remove(entry.path)
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+    size = sum(entry_size for _, entry_size, _ in entries)
+    evicted = 0
+    for _, entry_size, path in sorted(entries):
+        if size <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        size -= entry_size
+        evicted += 1
+    return evicted
+
+
+class ImageCache:
+    """Generated destination images stored on disk as compressed files, evicted least recently used first"""
+
+    def __init__(self, directory: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(city: str, prompt_template: str, model: str, size: str) -> str:
+        """Content address of an image: everything that changes what the model would draw"""
+        fields = [normalize_city(city), prompt_template, model, size]
+        return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.{IMAGE_FORMAT.lower()}")
+
+    def get(self, key: str) -> Image.Image | None:
+        path = self._path(key)
+        try:
+            image = Image.open(path)
+            image.load()
+        except (FileNotFoundError, OSError):
+            self.misses += 1
+            return None
+        # the modification time doubles as the last access time for LRU eviction
+        os.utime(path)
+        self.hits += 1
+        return image
+
+    def put(self, key: str, image: Image.Image) -> None:
+        buffer = BytesIO()
+        image.save(buffer, format=IMAGE_FORMAT, quality=IMAGE_QUALITY)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(temp_path, path)
+        with self._lock:
+            self.evictions += evict_least_recently_used(self.directory, self.max_bytes)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+image_cache = ImageCache()
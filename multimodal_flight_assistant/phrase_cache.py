@@ -0,0 +1,62 @@
+import hashlib
+import json
+import os
+import threading
+from image_cache import evict_least_recently_used
+
+PHRASE_CACHE_DIR = "cache/speech"
+PHRASE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+
+class PhraseCache:
+    """Synthesized MP3 audio for replies that have been spoken before"""
+
+    def __init__(self, directory: str = PHRASE_CACHE_DIR, max_bytes: int = PHRASE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str, instructions: str, model: str, voice: str) -> str:
+        fields = [" ".join(text.split()), instructions, model, voice]
+        return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return audio
+
+    def put(self, key: str, audio: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(audio)
+        os.replace(temp_path, path)
+        with self._lock:
+            self.evictions += evict_least_recently_used(self.directory, self.max_bytes)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+phrase_cache = PhraseCache()
@@ -0,0 +1,45 @@
+from fares import FareIndex, FareTable
+
+ROWS = [
+    ("london", "$799", ["lon", "londres", "lhr"]),
+    ("paris", "$899", ["par", "cdg"]),
+    ("tokyo", "$1400", ["tokio", "tyo", "nrt", "hnd"]),
+    ("berlin", "$499", ["ber"]),
+    ("saigon", "$1000", ["ho chi minh city", "ho chi minh", "hcmc", "sai gon", "sgn"]),
+]
+
+
+def city(name):
+    fare = FareIndex(ROWS).lookup(name)
+    return fare.city if fare else None
+
+
+def test_exact_names_and_aliases_match():
+    assert city("London") == "london"
+    assert city("Hồ Chí Minh City") == "saigon"
+    assert city("HCMC") == "saigon"
+    assert city("ber") == "berlin"
+
+
+def test_misspellings_match():
+    assert city("Londn") == "london"
+    assert city("Tokyio") == "tokyo"
+    assert city("Berln") == "berlin"
+    assert city("Ho Chi Min") == "saigon"
+
+
+def test_near_miss_cities_do_not_match():
+    for name in ["Bern", "Bergen", "Parma", "Parish", "Londonderry", "New London"]:
+        assert city(name) is None, name
+
+
+def test_ambiguous_matches_are_rejected():
+    assert FareIndex([("portland", "$300", [])]).lookup("Portlnd").city == "portland"
+    index = FareIndex([("portland", "$300", []), ("portlund", "$400", [])])
+    assert index.lookup("Portlnd") is None
+
+
+def test_missing_file_uses_fallback(tmp_path):
+    table = FareTable(path=str(tmp_path / "fares.csv"), fallback={"london": "$799"})
+    assert table.lookup("london").price == "$799"
+    assert table.lookup("Bern") is None
@@ -0,0 +1,160 @@
+from collections import Counter
+import json
+import math
+import os
+import re
+import threading
+import time
+
+CACHE_PATH = ".cache/answers.json"
+SIMILARITY_THRESHOLD = 0.7
+"""Cosine the topic words need once the question words and negations already match"""
+
+MAX_EXTRA_WORDS = 1
+"""Topic words a question may add to a cached one, like "main" when a visitor asks for the main skills"""
+
+ANSWER_TTL = 7 * 24 * 60 * 60
+MAX_ANSWERS = 500
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "was", "were", "be", "do", "does", "did", "have", "has", "had",
+    "you", "your", "yours", "yourself", "i", "me", "my", "to", "of", "for", "in", "on", "at", "with", "and",
+    "or", "can", "could", "would", "please", "tell", "about", "so", "just", "any", "some",
+}
+"""Filler words only; question words and negations change the answer, so they are never dropped"""
+
+QUESTION_WORDS = {"what", "where", "when", "who", "whom", "whose", "why", "how", "which"}
+NEGATIONS = {"not", "no", "never", "nor", "none", "nothing", "without"}
+
+
+def content_words(text):
+    """Words that carry the question's meaning: contractions like don't reduced to not, plurals to singular"""
+    words = set()
+    for word in re.findall(r"[a-z0-9']+", text.lower()):
+        if word.endswith("n't"):
+            words.add("not")
+            word = word[:-3]
+        word = word.strip("'").split("'")[0]
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        if word and word not in STOPWORDS:
+            words.add(word)
+    return frozenset(words)
+
+
+def embed(text):
+    """Sparse word and character trigram vector, a local stand-in for a sentence embedding"""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    vector = Counter(words)
+    for word in words:
+        padded = f" {word} "
+        vector.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return vector
+
+
+def cosine(a, b):
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[key] for key, count in a.items() if key in b)
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
+
+
+def folder_fingerprint(folder):
+    """Cheap fingerprint of the folder's files from their names, sizes and modification times"""
+    entries = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            stat = os.stat(os.path.join(root, name))
+            entries.append(f"{os.path.join(root, name)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(sorted(entries))
+
+
+class AnswerCache:
+    """Evaluator-approved answers to opening questions, matched by similarity and cleared when me/ changes"""
+
+    def __init__(self, source_folder="me", path=CACHE_PATH, threshold=SIMILARITY_THRESHOLD, ttl=ANSWER_TTL):
+        self.source_folder = source_folder
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.fingerprint = folder_fingerprint(source_folder)
+        self.entries = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved["fingerprint"] == self.fingerprint:
+                self.entries = saved["entries"]
+        self.keys = [self.__key(entry["question"]) for entry in self.entries]
+
+    def __check_sources(self):
+        fingerprint = folder_fingerprint(self.source_folder)
+        if fingerprint != self.fingerprint:
+            print("Biography changed - clearing cached answers")
+            self.fingerprint = fingerprint
+            self.entries, self.keys = [], []
+            self.__save()
+
+    @staticmethod
+    def __key(question):
+        words = content_words(question)
+        guard = words & (QUESTION_WORDS | NEGATIONS)
+        topic = words - guard
+        return guard, topic, embed(" ".join(sorted(topic)))
+
+    def __matches(self, key, entry_key):
+        # A hit skips generation and evaluation, so a different question word or a dropped "not" never
+        # matches, and every topic word of the cached question must be asked about again: "for hire" vs
+        # "for a hike" or Google vs Meta would otherwise score highly
+        guard, topic, vector = key
+        entry_guard, entry_topic, entry_vector = entry_key
+        if guard != entry_guard or not entry_topic <= topic or len(topic - entry_topic) > MAX_EXTRA_WORDS:
+            return 0.0
+        if not topic:
+            return 1.0
+        return cosine(vector, entry_vector)
+
+    def lookup(self, question):
+        key = self.__key(question)
+        now = time.time()
+        with self._lock:
+            self.__check_sources()
+            best, best_score = None, self.threshold
+            for entry, entry_key in zip(self.entries, self.keys):
+                if now - entry["created"] > self.ttl:
+                    continue
+                score = self.__matches(key, entry_key)
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return best["answer"]
+
+    def store(self, question, answer):
+        now = time.time()
+        with self._lock:
+            self.__check_sources()
+            keep = [i for i, entry in enumerate(self.entries) if now - entry["created"] <= self.ttl]
+            keep = keep[-(MAX_ANSWERS - 1) :]
+            self.entries = [self.entries[i] for i in keep] + [{"question": question, "answer": answer, "created": now}]
+            self.keys = [self.keys[i] for i in keep] + [self.__key(question)]
+            self.__save()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "entries": self.entries}, f)
+        os.replace(f"{self.path}.tmp", self.path)
@@ -1,29 +1,61 @@
 from dotenv import load_dotenv
-from openai import OpenAI
-import json
+from io import BytesIO
+import asyncio
+import hashlib
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from openai.types.chat import ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
 import os
-import requests
+import time
 from pypdf import PdfReader
+from retrieval import BiographyIndex, TOP_K
+from prefilter import Evaluation, LocalEvaluator
+from pushover_dispatch import push
+from tool_engine import ToolRegistry
+from history import HistoryCompactor, format_transcript
+from answer_cache import AnswerCache
 import gradio as gr
-from pydantic import BaseModel
 
 load_dotenv(override=True)
 
+NUM_CANDIDATES = 3
+"""Candidate replies generated per round and evaluated in parallel"""
 
-class Evaluation(BaseModel):
-    is_acceptable: bool
-    feedback: str
+MAX_ROUNDS = 3
+CHAT_TIME_BUDGET = 30
+"""Seconds a turn may spend generating and evaluating before falling back"""
 
+CACHE_DIR = ".cache"
+"""Parsed CV text is cached here, keyed by the PDF's hash"""
 
-def push(text):
-    requests.post(
-        "https://api.pushover.net/1/messages.json",
-        data={
-            "token": os.getenv("PUSHOVER_TOKEN"),
-            "user": os.getenv("PUSHOVER_USER"),
-            "message": text,
-        },
-    )
+LOCAL_PREFILTER = True
+"""Settle obvious accept and reject cases locally and only send ambiguous replies to Gemini"""
+
+RETRIEVAL = True
+"""Send only the CV chunks relevant to each message instead of the whole CV"""
+
+RETRIEVAL_TURNS = 2
+"""Earlier user messages added to the retrieval query, so follow-ups like "and before that?" find their topic"""
+
+RETRIEVAL_FOLDER = None
+"""Set to "me" to index every document under me/ rather than just the CV"""
+
+ANSWER_CACHE = True
+"""Serve approved answers to repeated opening questions without calling any model"""
+
+STREAMING = True
+"""Stream reply tokens to the UI as they arrive, retracting the reply if the evaluator rejects it"""
+
+RETRACTION_NOTICE = "_Let me rephrase that..._"
+
+MAX_CONNECTIONS = 500
+MAX_KEEPALIVE_CONNECTIONS = 100
+"""Each client's connection pool is shared by every chat in the process"""
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+
+FALLBACK_REPLY = "Sorry, I'm having trouble answering that right now. Could you try rephrasing your question?"
 
 
 def record_user_details(email, name="Name not provided", notes="not provided"):
@@ -76,51 +108,109 @@ record_unknown_question_json = {
     },
 }
 
-tools = [
-    {"type": "function", "function": record_user_details_json},
-    {"type": "function", "function": record_unknown_question_json},
-]
+def async_client(**kwargs):
+    """AsyncOpenAI client with a connection pool sized for hundreds of concurrent chats"""
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=30,
+        ),
+    )
+    return AsyncOpenAI(http_client=http_client, timeout=httpx.Timeout(CHAT_TIME_BUDGET, connect=5.0), **kwargs)
+
+
+registry = ToolRegistry()
+registry.register(record_user_details, record_user_details_json)
+registry.register(record_unknown_question, record_unknown_question_json)
+tools = registry.specs()
 
 
 class Me:
     def __read_biography(self):
-        reader = PdfReader("me/me_cv.pdf")
-        self.linkedin = ""
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                self.linkedin += text
+        with open("me/me_cv.pdf", "rb") as f:
+            pdf = f.read()
+        cache_path = os.path.join(CACHE_DIR, f"cv-{hashlib.sha256(pdf).hexdigest()}.txt")
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                self.linkedin = f.read()
+        else:
+            reader = PdfReader(BytesIO(pdf))
+            self.linkedin = ""
+            for page in reader.pages:
+                text = page.extract_text()
+                if text:
+                    self.linkedin += text
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as f:
+                f.write(self.linkedin)
         with open("me/me_summary.txt", "r", encoding="utf-8") as f:
             self.summary = f.read()
 
-    def __init__(self):
-        self.openai = OpenAI()
-        self.gemini = OpenAI(
+    def __init__(
+        self,
+        streaming=STREAMING,
+        retrieval=RETRIEVAL,
+        retrieval_folder=RETRIEVAL_FOLDER,
+        local_prefilter=LOCAL_PREFILTER,
+        answer_cache=ANSWER_CACHE,
+        openai_client=None,
+        gemini_client=None,
+    ):
+        self.streaming = streaming
+        self.openai = openai_client or async_client()
+        self.gemini = gemini_client or async_client(
             api_key=os.getenv("GOOGLE_API_KEY"),
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
+            base_url=GEMINI_BASE_URL,
         )
+        self.compactor = HistoryCompactor(self.openai)
+        self.answers = AnswerCache() if answer_cache else None
         self.short_name = "Bach"
         self.name = "Bach Do"
         self.__read_biography()
+        self.prefilter = None
+        if local_prefilter:
+            self.prefilter = LocalEvaluator(f"{self.name}\n{self.summary}\n{self.linkedin}")
+        self.index = None
+        if retrieval and retrieval_folder:
+            self.index = BiographyIndex.from_folder(retrieval_folder, exclude=["me/me_summary.txt"])
+        elif retrieval:
+            self.index = BiographyIndex(["me/me_cv.pdf"])
+        # Built once so every request shares a byte-identical prefix the provider can cache
+        self._system_prompt = self.__build_system_prompt()
+        self._evaluator_system_prompt = self.__build_evaluator_system_prompt()
 
-    def handle_tool_call(self, tool_calls):
-        results = []
-        for tool_call in tool_calls:
-            tool_name = tool_call.function.name
-            arguments = json.loads(tool_call.function.arguments)
-            print(f"Tool called: {tool_name}", flush=True)
-            tool = globals().get(tool_name)
-            result = tool(**arguments) if tool else {}
-            results.append(
-                {
-                    "role": "tool",
-                    "content": json.dumps(result),
-                    "tool_call_id": tool_call.id,
-                }
-            )
-        return results
+    async def handle_tool_call(self, tool_calls):
+        return await registry.execute(tool_calls)
 
     def system_prompt(self):
+        return self._system_prompt
+
+    def retrieve(self, message, history=()):
+        """Relevant background for the message, or an empty string when the whole CV is in the prompt"""
+        if self.index is None:
+            return ""
+        turns = [m["content"] for m in history if m.get("role") == "user" and isinstance(m.get("content"), str)]
+        query = "\n".join(turns[-RETRIEVAL_TURNS:] + [message]) if RETRIEVAL_TURNS else message
+        chunks = self.index.search(query, TOP_K)
+        return "\n\n".join(chunks) if chunks else "No matching excerpts."
+
+    def build_messages(self, message, summary, recent, context):
+        # The summary and retrieved excerpts go after the static prompt so the cached prefix stays untouched
+        messages = [{"role": "system", "content": self.system_prompt()}]
+        if summary:
+            messages.append({"role": "system", "content": f"## Summary of the conversation so far:\n{summary}"})
+        messages += recent
+        if context:
+            messages.append({"role": "system", "content": f"## Relevant excerpts:\n{context}"})
+        return messages + [{"role": "user", "content": message}]
+
+    def __profile_section(self):
+        if self.index is not None:
+            return f"## LinkedIn Profile:\nRelevant excerpts from {self.name}'s LinkedIn profile and other documents are provided with each message."
+        return f"## LinkedIn Profile:\n{self.linkedin}"
+
+    def __build_system_prompt(self):
         system_prompt = f"You are acting as {self.name}. You are answering questions on {self.name}'s website, \
 particularly questions related to {self.name}'s career, background, skills and experience. \
 Your responsibility is to represent {self.name} for interactions on the website as faithfully as possible. \
@@ -129,72 +219,225 @@ Be professional and engaging, as if talking to a potential client or future empl
 If you don't know the answer to any question, say you don't know and use your record_unknown_question tool to record the question that you couldn't answer, even if it's about something trivial or unrelated to career. \
 If the user is engaging in discussion, after 5 messages, try to steer them towards getting in touch via email; ask for their email and record it using your record_user_details tool. "
 
-        system_prompt += f"\n\n## Summary:\n{self.summary}\n\n## LinkedIn Profile:\n{self.linkedin}\n\n"
+        system_prompt += f"\n\n## Summary:\n{self.summary}\n\n{self.__profile_section()}\n\n"
         system_prompt += f"With this context, please chat with the user, always staying in character as {self.short_name}."
         return system_prompt
 
-    def evaluator_user_prompt(self, reply, message, history):
+    def evaluator_user_prompt(self, reply, message, transcript, context=""):
         user_prompt = (
-            f"Here's the conversation between the User and the Agent: \n\n{history}\n\n"
+            f"Here's the conversation between the User and the Agent: \n\n{transcript}\n\n"
         )
+        if context:
+            user_prompt += f"Here are the excerpts the Agent was given: \n\n{context}\n\n"
         user_prompt += f"Here's the latest message from the User: \n\n{message}\n\n"
         user_prompt += f"Here's the latest response from the Agent: \n\n{reply}\n\n"
         user_prompt += f"Please evaluate the response, replying with whether it is acceptable and your feedback."
         return user_prompt
 
-    def __evaluate(self, reply, message, history) -> Evaluation:
+    def __build_evaluator_system_prompt(self):
         evaluator_system_prompt = f"You are an evaluator that decides whether a response to a question is acceptable. \
 You are provided with a conversation between a User and an Agent. Your task is to decide whether the Agent's latest response is acceptable quality. \
 The Agent is playing the role of {self.name} and is representing {self.name} on their website. \
 The Agent has been instructed to be professional and engaging, as if talking to a potential client or future employer who came across the website. \
 The Agent has been provided with context on {self.name} in the form of their summary and LinkedIn details. Here's the information:"
-        evaluator_system_prompt += f"\n\n## Summary:\n{self.summary}\n\n## LinkedIn Profile:\n{self.linkedin}\n\n"
+        evaluator_system_prompt += f"\n\n## Summary:\n{self.summary}\n\n{self.__profile_section()}\n\n"
         evaluator_system_prompt += f"With this context, please evaluate the latest response, replying with whether the response is acceptable and your feedback."
+        return evaluator_system_prompt
 
-        messages = [{"role": "system", "content": evaluator_system_prompt}] + [
+    async def __evaluate(self, reply, message, transcript, context="") -> Evaluation:
+        if self.prefilter is not None:
+            evaluation = self.prefilter.check(reply, message)
+            if evaluation is not None:
+                print(f"Local evaluation: {self.prefilter.stats()}")
+                return evaluation
+        messages = [{"role": "system", "content": self._evaluator_system_prompt}] + [
             {
                 "role": "user",
-                "content": self.evaluator_user_prompt(reply, message, history),
+                "content": self.evaluator_user_prompt(reply, message, transcript, context),
             }
         ]
 
-        response = self.gemini.beta.chat.completions.parse(
+        response = await self.gemini.beta.chat.completions.parse(
             model="gemini-2.0-flash", messages=messages, response_format=Evaluation
         )
         return response.choices[0].message.parsed
 
-    def chat(self, message, history):
-        messages = (
-            [{"role": "system", "content": self.system_prompt()}]
-            + history
-            + [{"role": "user", "content": message}]
-        )
-        done = False
-        while not done:
-            # generate response
-            response = self.openai.chat.completions.create(
-                model="gpt-4o-mini", messages=messages, tools=tools
-            )
-            # evaluate response
-            evaluation = self.__evaluate(
-                response.choices[0].message.content, message, history
-            )
+    async def __select_reply(self, candidates, message, transcript, context, deadline):
+        """Evaluate the candidates concurrently and return the first acceptable one"""
+        tasks = {
+            asyncio.ensure_future(self.__evaluate(candidate, message, transcript, context)): candidate
+            for candidate in candidates
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(0, deadline - time.monotonic()),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    print("Evaluation timed out")
+                    break
+                for task in done:
+                    try:
+                        evaluation = task.result()
+                    except Exception as e:
+                        print(f"Evaluation error: {e}")
+                        continue
+                    if evaluation.is_acceptable:
+                        return tasks[task]
+                    print("Failed evaluation")
+                    print(evaluation.feedback)
+        finally:
+            for task in pending:
+                task.cancel()
+        return None
+
+    async def chat(self, message, history):
+        """Yield the reply to show; in streaming mode each yield is the reply so far"""
+        # Only opening questions are cached, later answers depend on the conversation
+        cacheable = self.answers is not None and not any(m.get("role") == "user" for m in history)
+        if cacheable:
+            answer = await asyncio.to_thread(self.answers.lookup, message)
+            if answer is not None:
+                print("Answer cache hit")
+                yield answer
+                return
+        if self.streaming:
+            async for text in self.stream_reply(message, history, cacheable):
+                yield text
+        else:
+            yield await self.reply(message, history, cacheable)
+
+    async def remember(self, message, reply, cacheable, used_tools):
+        # Answers that called a tool must keep calling it, so they are never cached
+        if cacheable and not used_tools:
+            await asyncio.to_thread(self.answers.store, message, reply)
+
+    async def stream_reply(self, message, history, cacheable=False):
+        context = self.retrieve(message, history)
+        summary, recent = await self.compactor.compact(history)
+        transcript = format_transcript(summary, recent)
+        messages = self.build_messages(message, summary, recent, context)
+        deadline = time.monotonic() + CHAT_TIME_BUDGET
+        text, used_tools = "", False
+        for _ in range(MAX_ROUNDS):
+            text, tool_calls = "", {}
+            try:
+                stream = await self.openai.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    tools=tools,
+                    stream=True,
+                    timeout=max(1.0, deadline - time.monotonic()),
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta.content:
+                        text += delta.content
+                        yield text
+                    # tool calls arrive as fragments keyed by their index
+                    for call in delta.tool_calls or []:
+                        entry = tool_calls.setdefault(call.index, {"id": "", "name": "", "arguments": ""})
+                        entry["id"] = call.id or entry["id"]
+                        if call.function:
+                            entry["name"] += call.function.name or ""
+                            entry["arguments"] += call.function.arguments or ""
+            except Exception as e:
+                # the partial reply was never evaluated, so take it back before retrying
+                print(f"Generation failed: {e}")
+                if text:
+                    yield RETRACTION_NOTICE
+                if time.monotonic() >= deadline:
+                    break
+                continue
+
+            if tool_calls:
+                calls = [
+                    ChatCompletionMessageToolCall(
+                        id=entry["id"],
+                        type="function",
+                        function=Function(name=entry["name"], arguments=entry["arguments"]),
+                    )
+                    for _, entry in sorted(tool_calls.items())
+                ]
+                messages.append(
+                    {
+                        "role": "assistant",
+                        "content": text or None,
+                        "tool_calls": [call.model_dump() for call in calls],
+                    }
+                )
+                messages.extend(await self.handle_tool_call(calls))
+                used_tools = True
+                continue
+
+            # evaluate the completed stream; if the evaluator is down, keep what was shown
+            try:
+                evaluation = await self.__evaluate(text, message, transcript, context)
+            except Exception as e:
+                print(f"Evaluation error: {e}")
+                return
             if evaluation.is_acceptable:
                 print("Passed evaluation - returning reply")
+                await self.remember(message, text, cacheable, used_tools)
+                return
+            print("Failed evaluation - retracting reply")
+            print(evaluation.feedback)
+            if time.monotonic() >= deadline:
+                break
+            yield RETRACTION_NOTICE
+
+        # nothing passed evaluation, so nothing that was shown may stay on screen
+        print("Out of retries - returning fallback reply")
+        yield FALLBACK_REPLY
 
-                if response.choices[0].finish_reason == "tool_calls":
-                    message = response.choices[0].message
-                    tool_calls = message.tool_calls
-                    results = self.handle_tool_call(tool_calls)
-                    messages.append(message)
-                    messages.extend(results)
-                else:
-                    done = True
-            else:
-                print("Failed evaluation - retrying")
-                print(evaluation.feedback)
+    async def reply(self, message, history, cacheable=False):
+        context = self.retrieve(message, history)
+        summary, recent = await self.compactor.compact(history)
+        transcript = format_transcript(summary, recent)
+        messages = self.build_messages(message, summary, recent, context)
+        deadline = time.monotonic() + CHAT_TIME_BUDGET
+        used_tools = False
+        for _ in range(MAX_ROUNDS):
+            # generate candidate responses in a single request
+            try:
+                response = await self.openai.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    tools=tools,
+                    n=NUM_CANDIDATES,
+                    timeout=max(1.0, deadline - time.monotonic()),
+                )
+            except Exception as e:
+                print(f"Generation failed: {e}")
+                break
+            tool_choice = next(
+                (c for c in response.choices if c.finish_reason == "tool_calls"), None
+            )
+            if tool_choice is not None:
+                results = await self.handle_tool_call(tool_choice.message.tool_calls)
+                messages.append(tool_choice.message)
+                messages.extend(results)
+                used_tools = True
+                continue
+            # evaluate them in parallel
+            candidates = [c.message.content for c in response.choices if c.message.content]
+            reply = await self.__select_reply(candidates, message, transcript, context, deadline)
+            if reply is not None:
+                print("Passed evaluation - returning reply")
+                await self.remember(message, reply, cacheable, used_tools)
+                return reply
+            if time.monotonic() >= deadline:
+                break
+            print("No acceptable candidate - retrying")
 
-        return response.choices[0].message.content
+        # every candidate was rejected, so none of them is safe to show
+        print("Out of retries - returning fallback reply")
+        return FALLBACK_REPLY
 
 
 if __name__ == "__main__":
@@ -209,6 +452,7 @@ if __name__ == "__main__":
     gr.ChatInterface(
         me.chat,
         type="messages",
+        concurrency_limit=None,
         theme="citrus",
         chatbot=gr.Chatbot(
             type="messages",
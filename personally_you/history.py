@@ -0,0 +1,93 @@
+from collections import OrderedDict
+import hashlib
+import threading
+
+KEEP_MESSAGES = 8
+"""Most recent messages passed through verbatim; older ones are folded into the summary"""
+
+SUMMARY_BATCH = 8
+"""Messages that must pile up beyond the verbatim window before the summary is updated"""
+
+SUMMARY_MODEL = "gpt-4o-mini"
+CACHE_SIZE = 1024
+
+SUMMARY_INSTRUCTIONS = "You maintain a running summary of a conversation between a website visitor (User) and \
+an agent representing the site owner (Agent). Update the summary with the new messages. Keep every fact the \
+visitor shared about themselves (name, email, company, interests), the questions they asked and what they were \
+told. Write at most 200 words of plain prose."
+
+
+def format_transcript(summary, messages):
+    """Compact plain-text view of the conversation for the evaluator"""
+    lines = [f"(Summary of earlier conversation: {summary})"] if summary else []
+    for message in messages:
+        speaker = "User" if message["role"] == "user" else "Agent"
+        lines.append(f"{speaker}: {message['content']}")
+    return "\n".join(lines)
+
+
+class HistoryCompactor:
+    """Keeps recent messages verbatim and incrementally summarizes the rest, reusing earlier summaries"""
+
+    def __init__(self, client, keep_messages=KEEP_MESSAGES):
+        self.client = client
+        self.keep_messages = keep_messages
+        self.summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def compact(self, history):
+        """Return (summary, recent messages) for the history"""
+        messages = [
+            {"role": m["role"], "content": m["content"]}
+            for m in history
+            if m.get("role") in ("user", "assistant") and isinstance(m.get("content"), str)
+        ]
+        keys = self.__prefix_keys(messages)
+        summary, start = self.__longest_summarized_prefix(keys[: max(len(messages) - self.keep_messages, 0)])
+        # Only pay for a summary update once a full batch has piled up behind the window
+        if len(messages) - self.keep_messages - start < SUMMARY_BATCH:
+            return summary, messages[start:]
+        end = len(messages) - self.keep_messages
+        try:
+            summary = await self.__summarize(summary, messages[start:end], keys[end - 1])
+        except Exception as e:
+            print(f"History summarization failed: {e}")
+            return summary, messages[start:]
+        return summary, messages[end:]
+
+    @staticmethod
+    def __prefix_keys(messages):
+        # Chained hashes give every prefix of the history its own key, so sessions that share
+        # a beginning share summaries and each turn only summarizes what is new
+        keys = []
+        digest = b""
+        for message in messages:
+            digest = hashlib.sha256(digest + f"{message['role']}:{message['content']}".encode("utf-8")).digest()
+            keys.append(digest)
+        return keys
+
+    def __longest_summarized_prefix(self, keys):
+        with self._lock:
+            for i in range(len(keys) - 1, -1, -1):
+                if keys[i] in self.summaries:
+                    self.summaries.move_to_end(keys[i])
+                    return self.summaries[keys[i]], i + 1
+        return "", 0
+
+    async def __summarize(self, summary, new_messages, key):
+        response = await self.client.chat.completions.create(
+            model=SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                {
+                    "role": "user",
+                    "content": f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{format_transcript('', new_messages)}",
+                },
+            ],
+        )
+        summary = response.choices[0].message.content
+        with self._lock:
+            self.summaries[key] = summary
+            while len(self.summaries) > CACHE_SIZE:
+                self.summaries.popitem(last=False)
+        return summary
@@ -0,0 +1,167 @@
+"""Load test for Me.chat against a local fake OpenAI-compatible server.
+
+Compares the old blocking design, where every chat holds one of Gradio's 40 worker threads for the
+whole turn, with the async implementation serving every chat from a single event loop:
+
+    uv run load_test.py --chats 400 --latency 2
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import asyncio
+import json
+import multiprocessing
+import statistics
+import time
+from openai import OpenAI
+from app import Me, async_client
+from prefilter import Evaluation
+
+QUESTIONS = [
+    "What do you do for a living?",
+    "Which programming languages do you use most?",
+    "Tell me about your most recent role.",
+    "What kind of projects are you looking for?",
+]
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.5
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.latency)
+        if "response_format" in request:
+            content = Evaluation(is_acceptable=True, feedback="Looks good.").model_dump_json()
+        else:
+            content = "I build agentic AI systems and enjoy talking about them."
+        if request.get("stream"):
+            chunks = [
+                {"choices": [{"index": 0, "delta": {"role": "assistant", "content": word + " "}, "finish_reason": None}]}
+                for word in content.split()
+            ]
+            chunks.append({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            body = "".join(
+                f"data: {json.dumps({'id': 'fake', 'object': 'chat.completion.chunk', 'created': 0, 'model': request['model'], **chunk})}\n\n"
+                for chunk in chunks
+            )
+            self.__send(body + "data: [DONE]\n\n", "text/event-stream")
+            return
+        choices = [
+            {"index": i, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            for i in range(request.get("n") or 1)
+        ]
+        response = {
+            "id": "fake",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request["model"],
+            "choices": choices,
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+        self.__send(json.dumps(response), "application/json")
+
+    def __send(self, body, content_type):
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def serve(latency, ports):
+    FakeOpenAIHandler.latency = latency
+    server = FakeOpenAIServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+def start_server(latency):
+    """Run the fake server in its own process so it doesn't compete with the client for the GIL"""
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(latency, ports), daemon=True)
+    server.start()
+    return server, f"http://127.0.0.1:{ports.get()}/v1"
+
+
+def blocking_turn(openai, gemini, message):
+    """The remote calls one turn made before the migration, each blocking its worker thread"""
+    started = time.monotonic()
+    stream = openai.chat.completions.create(
+        model="gpt-4o-mini", messages=[{"role": "user", "content": message}], stream=True
+    )
+    reply = "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+    gemini.beta.chat.completions.parse(
+        model="gemini-2.0-flash",
+        messages=[{"role": "user", "content": reply}],
+        response_format=Evaluation,
+    )
+    return time.monotonic() - started
+
+
+def run_blocking(base_url, chats, threads):
+    openai = OpenAI(api_key="fake", base_url=base_url)
+    gemini = OpenAI(api_key="fake", base_url=base_url)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        started = time.monotonic()
+        latencies = list(
+            executor.map(lambda i: blocking_turn(openai, gemini, QUESTIONS[i % len(QUESTIONS)]), range(chats))
+        )
+    return time.monotonic() - started, latencies
+
+
+async def async_turn(me, message):
+    started = time.monotonic()
+    async for _ in me.chat(message, []):
+        pass
+    return time.monotonic() - started
+
+
+async def run_async(base_url, chats):
+    me = Me(
+        local_prefilter=False,
+        answer_cache=False,
+        openai_client=async_client(api_key="fake", base_url=base_url),
+        gemini_client=async_client(api_key="fake", base_url=base_url),
+    )
+    started = time.monotonic()
+    latencies = await asyncio.gather(*(async_turn(me, QUESTIONS[i % len(QUESTIONS)]) for i in range(chats)))
+    return time.monotonic() - started, latencies
+
+
+def report(label, wall, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label:<22} wall {wall:6.2f}s  throughput {len(latencies) / wall:7.1f} chats/s  "
+        f"p50 {statistics.median(ordered):5.2f}s  p95 {p95:5.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare blocking and async chat concurrency")
+    parser.add_argument("--chats", type=int, default=200, help="concurrent chats to start")
+    parser.add_argument("--latency", type=float, default=2.0, help="seconds the fake model takes per request")
+    parser.add_argument("--threads", type=int, default=40, help="worker threads for the blocking baseline")
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.latency)
+    print(f"{args.chats} chats, {args.latency}s per model call")
+    report(f"blocking ({args.threads} threads)", *run_blocking(base_url, args.chats, args.threads))
+    report("async", *asyncio.run(run_async(base_url, args.chats)))
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+from pydantic import BaseModel
+import random
+import re
+import threading
+
+MAX_REPLY_CHARS = 4000
+
+PERSONA_BREAKERS = [
+    "as an ai",
+    "as a language model",
+    "i am an ai",
+    "i'm an ai",
+    "i am a chatbot",
+    "i'm a chatbot",
+    "i don't have personal experiences",
+]
+
+TOOL_NAMES = ["record_user_details", "record_unknown_question"]
+
+ACCEPT_OVERLAP = 0.6
+"""Share of a reply's content words that must appear in the biography or the question to accept locally"""
+
+REMOTE_SAMPLE_RATE = 0.1
+"""Share of locally accepted replies still sent to the remote evaluator, to keep the local checks honest"""
+
+STOPWORDS = {
+    "the", "and", "for", "that", "this", "with", "you", "your", "are", "was", "have", "has", "but",
+    "not", "from", "they", "them", "what", "when", "where", "which", "would", "could", "about",
+    "there", "their", "been", "will", "more", "also", "like", "just", "into", "some", "than",
+    "very", "really", "happy", "help", "feel", "free", "love", "great", "thanks", "thank",
+}
+
+
+class Evaluation(BaseModel):
+    is_acceptable: bool
+    feedback: str
+
+
+def content_words(text):
+    return {word for word in re.findall(r"[a-z][a-z']+", text.lower()) if len(word) > 3 and word not in STOPWORDS}
+
+
+class LocalEvaluator:
+    """Cheap checks that settle obvious accept and reject cases before the remote evaluator"""
+
+    def __init__(self, biography, sample_rate=REMOTE_SAMPLE_RATE):
+        self.vocabulary = content_words(biography)
+        # a phrase the biography itself uses is part of the persona, not a break from it
+        self.breakers = [phrase for phrase in PERSONA_BREAKERS if phrase not in biography.lower()]
+        self.numbers = set(re.findall(r"\d+", biography))
+        self.sample_rate = sample_rate
+        self.counts = {"accepted": 0, "rejected": 0, "sampled": 0, "remote": 0}
+        self._lock = threading.Lock()
+
+    def __count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def check(self, reply, message):
+        """Return an Evaluation for clear cases, or None when the remote evaluator should decide"""
+        text = (reply or "").strip()
+        lowered = text.lower()
+        if not text:
+            return self.__reject("The reply is empty.")
+        if len(text) > MAX_REPLY_CHARS:
+            return self.__reject("The reply is far too long for a chat message.")
+        for phrase in self.breakers:
+            if phrase in lowered:
+                return self.__reject(f"The reply breaks character ('{phrase}').")
+        for name in TOOL_NAMES:
+            if name in lowered:
+                return self.__reject("The reply leaks an internal tool call instead of using the tool.")
+
+        # Numbers the biography never mentions are the usual sign of a made-up fact
+        ungrounded_numbers = set(re.findall(r"\d+", text)) - self.numbers - set(re.findall(r"\d+", message))
+        words = content_words(text)
+        grounded = words & (self.vocabulary | content_words(message))
+        overlap = len(grounded) / len(words) if words else 1.0
+        if ungrounded_numbers or overlap < ACCEPT_OVERLAP:
+            self.__count("remote")
+            return None
+        if random.random() < self.sample_rate:
+            self.__count("sampled")
+            return None
+        self.__count("accepted")
+        return Evaluation(is_acceptable=True, feedback="Passed local checks.")
+
+    def __reject(self, feedback):
+        self.__count("rejected")
+        return Evaluation(is_acceptable=False, feedback=feedback)
+
+    def stats(self):
+        """How often the remote evaluator was skipped"""
+        total = sum(self.counts.values())
+        skipped = self.counts["accepted"] + self.counts["rejected"]
+        return {**self.counts, "remote_skip_rate": skipped / total if total else 0.0}
@@ -0,0 +1,110 @@
+from collections import Counter
+from pypdf import PdfReader
+import hashlib
+import json
+import math
+import os
+import re
+
+INDEX_PATH = ".cache/biography_index.json"
+CHUNK_WORDS = 120
+CHUNK_OVERLAP = 30
+TOP_K = 4
+EXTENSIONS = (".pdf", ".txt", ".md")
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def read_document(path):
+    if path.lower().endswith(".pdf"):
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def chunk_text(text, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Split text into overlapping windows of words"""
+    words = text.split()
+    if not words:
+        return []
+    step = size - overlap
+    return [" ".join(words[i : i + size]) for i in range(0, max(len(words) - overlap, 1), step)]
+
+
+class BiographyIndex:
+    """BM25 index over chunks of the biography documents, persisted to disk"""
+
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(self, paths, index_path=INDEX_PATH):
+        self.paths = sorted(paths)
+        self.index_path = index_path
+        self.chunks = []
+        self.term_freqs = []
+        self.doc_freqs = {}
+        self.lengths = []
+        self.avg_length = 0.0
+        self.__load_or_build()
+
+    @classmethod
+    def from_folder(cls, folder, exclude=(), index_path=INDEX_PATH):
+        """Index every supported document under the folder"""
+        paths = []
+        for root, _, files in os.walk(folder):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.lower().endswith(EXTENSIONS) and path not in exclude:
+                    paths.append(path)
+        return cls(paths, index_path)
+
+    def __fingerprint(self):
+        digest = hashlib.sha256()
+        for path in self.paths:
+            digest.update(path.encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        return digest.hexdigest()
+
+    def __load_or_build(self):
+        fingerprint = self.__fingerprint()
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved["fingerprint"] == fingerprint:
+                self.chunks = saved["chunks"]
+                self.__compute_statistics()
+                return
+        self.chunks = []
+        for path in self.paths:
+            name = os.path.basename(path)
+            self.chunks.extend(f"[{name}] {chunk}" for chunk in chunk_text(read_document(path)))
+        self.__compute_statistics()
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "chunks": self.chunks}, f)
+
+    def __compute_statistics(self):
+        self.term_freqs = [Counter(tokenize(chunk)) for chunk in self.chunks]
+        self.doc_freqs = Counter(term for freqs in self.term_freqs for term in freqs)
+        self.lengths = [sum(freqs.values()) for freqs in self.term_freqs]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def search(self, query, k=TOP_K):
+        """Return the k chunks that best match the query"""
+        n = len(self.chunks)
+        scores = []
+        for i, freqs in enumerate(self.term_freqs):
+            score = 0.0
+            for term in set(tokenize(query)):
+                if term not in freqs:
+                    continue
+                idf = math.log(1 + (n - self.doc_freqs[term] + 0.5) / (self.doc_freqs[term] + 0.5))
+                tf = freqs[term]
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                score += idf * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((score, i))
+        return [self.chunks[i] for _, i in sorted(scores, reverse=True)[:k]]
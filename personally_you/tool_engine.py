@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable
+import asyncio
+import json
+import threading
+
+TOOL_TIMEOUT = 5.0
+"""Seconds a tool may run before the model is told it timed out"""
+
+CACHE_SIZE = 256
+
+
+@dataclass
+class RegisteredTool:
+    func: Callable
+    spec: dict
+    timeout: float = TOOL_TIMEOUT
+    idempotent: bool = False
+    """Idempotent tools return the cached result when called again with the same arguments"""
+
+
+class ToolRegistry:
+    """Explicit tool registry that runs a turn's tool calls in parallel"""
+
+    def __init__(self, max_workers=8):
+        self.tools = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self.cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def register(self, func, spec, timeout=TOOL_TIMEOUT, idempotent=False):
+        self.tools[spec["name"]] = RegisteredTool(func, spec, timeout, idempotent)
+
+    def specs(self):
+        """Tool definitions in the format the chat completions API expects"""
+        return [{"type": "function", "function": tool.spec} for tool in self.tools.values()]
+
+    def __cached(self, key):
+        with self._cache_lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        return None
+
+    def __store(self, key, result):
+        with self._cache_lock:
+            self.cache[key] = result
+            if len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
+
+    async def __call(self, tool_call):
+        name = tool_call.function.name
+        print(f"Tool called: {name}", flush=True)
+        tool = self.tools.get(name)
+        try:
+            arguments = json.loads(tool_call.function.arguments or "{}")
+        except json.JSONDecodeError:
+            return {"error": "invalid arguments"}
+        if tool is None:
+            return {"error": f"unknown tool {name}"}
+        key = (name, json.dumps(arguments, sort_keys=True))
+        cached = self.__cached(key) if tool.idempotent else None
+        if cached is not None:
+            return cached
+        # Tools are plain blocking functions, so they run on the pool and never stall the event loop
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, partial(tool.func, **arguments)), tool.timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"Tool {name} timed out")
+            return {"error": "timed out"}
+        except Exception as e:
+            print(f"Tool {name} failed: {e}")
+            return {"error": str(e)}
+        if tool.idempotent:
+            self.__store(key, result)
+        return result
+
+    @staticmethod
+    def __call_key(tool_call):
+        try:
+            arguments = json.dumps(json.loads(tool_call.function.arguments or "{}"), sort_keys=True)
+        except json.JSONDecodeError:
+            arguments = tool_call.function.arguments
+        return tool_call.function.name, arguments
+
+    async def execute(self, tool_calls):
+        """Run every tool call concurrently and return the tool messages in call order
+
+        Identical calls within one turn run once and share the result, so a tool with side effects
+        isn't triggered twice by a model that repeats itself.
+        """
+        calls = {}
+        for tool_call in tool_calls:
+            calls.setdefault(self.__call_key(tool_call), tool_call)
+        results = dict(zip(calls, await asyncio.gather(*(self.__call(call) for call in calls.values()))))
+        return [
+            {
+                "role": "tool",
+                "content": json.dumps(results[self.__call_key(tool_call)]),
+                "tool_call_id": tool_call.id,
+            }
+            for tool_call in tool_calls
+        ]
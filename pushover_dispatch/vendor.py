@@ -0,0 +1,31 @@
+"""Copy pushover_dispatch.py into the projects that are deployed without access to this folder.
+
+    python vendor.py          refresh the copies
+    python vendor.py --check  exit non-zero if a copy has drifted
+"""
+from pathlib import Path
+import sys
+
+HERE = Path(__file__).resolve().parent
+SOURCE = HERE / "pushover_dispatch.py"
+COPIES = [
+    HERE.parent / "personally_you" / "pushover_dispatch.py",
+    HERE.parent / "stock_agent" / "src" / "stock_picker" / "tools" / "pushover_dispatch.py",
+]
+
+
+def main():
+    check = "--check" in sys.argv[1:]
+    source = SOURCE.read_text()
+    stale = [copy for copy in COPIES if not copy.exists() or copy.read_text() != source]
+    for copy in stale:
+        if check:
+            print(f"Out of date: {copy.relative_to(HERE.parent)}")
+        else:
+            copy.write_text(source)
+            print(f"Updated {copy.relative_to(HERE.parent)}")
+    return 1 if check and stale else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""Offline benchmark for the research pipeline.
+
+Every agent is served by an in-process fake model with configurable latency, jitter and
+error rate, so throughput and tail latency can be measured without network or API keys:
+
+    python benchmark.py --runs 50 --concurrency 20 --max-calls 8
+"""
+from agents import RunConfig, Usage, set_tracing_disabled
+from agents.items import ModelResponse
+from agents.models.interface import Model, ModelProvider
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+from planner_agent import WebSearchPlan, WebSearchQuery
+from research_agent import ReportData
+from research_manager import GRACE_PERIOD, QUORUM
+from email_delivery import LocalTransport, email_dispatcher
+from scheduler import ModelLimiter, ResearchScheduler
+import argparse
+import asyncio
+import random
+import time
+
+LATENCIES = {
+    "WebSearchPlan": 1.5,
+    "ReportData": 8.0,
+    "text": 3.0,
+}
+"""Mean seconds per call for each kind of output, roughly matching gpt-4o-mini in production"""
+
+WORDS = ["market", "battery", "policy", "supply", "growth", "startup", "regulation", "pricing", "adoption", "research"]
+
+
+class FakeModelError(Exception):
+    pass
+
+
+class FakeModel(Model):
+    """Answers every agent with canned output of the right shape after a random delay"""
+
+    def __init__(self, time_scale: float, jitter: float, error_rate: float, num_searches: int):
+        self.time_scale = time_scale
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.num_searches = num_searches
+        self.calls = 0
+
+    def _output(self, kind: str) -> str:
+        if kind == "WebSearchPlan":
+            searches = [
+                WebSearchQuery(reason="benchmark", query=f"{i} {' '.join(random.sample(WORDS, 3))}")
+                for i in range(self.num_searches)
+            ]
+            return WebSearchPlan(searches=searches).model_dump_json()
+        if kind == "ReportData":
+            report = "\n\n".join(f"## Section {i}\n" + "Lorem ipsum dolor sit amet. " * 40 for i in range(8))
+            return ReportData(
+                short_summary="A benchmark report.", markdown_report=report, follow_up_questions=["More?"]
+            ).model_dump_json()
+        return " ".join(random.choices(WORDS, k=200)) + "."
+
+    async def _respond(self, input, output_schema) -> tuple[ResponseOutputMessage, int, int]:
+        """Wait out the simulated latency, then return the message and its input and output token counts"""
+        self.calls += 1
+        kind = "text" if output_schema is None or output_schema.is_plain_text() else output_schema.name()
+        # Log-normal delays give the long right tail real model calls have
+        await asyncio.sleep(LATENCIES.get(kind, 1.0) * self.time_scale * random.lognormvariate(0, self.jitter))
+        if random.random() < self.error_rate:
+            raise FakeModelError(f"Simulated {kind} failure")
+        text = self._output(kind)
+        message = ResponseOutputMessage(
+            id="fake",
+            content=[ResponseOutputText(text=text, type="output_text", annotations=[])],
+            role="assistant",
+            status="completed",
+            type="message",
+        )
+        return message, len(str(input)) // 4, len(text) // 4
+
+    async def get_response(
+        self,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        handoffs,
+        tracing,
+        *,
+        previous_response_id=None,
+    ):
+        message, input_tokens, output_tokens = await self._respond(input, output_schema)
+        usage = Usage(
+            requests=1,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+        return ModelResponse(output=[message], usage=usage, response_id=None)
+
+    async def stream_response(
+        self,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        handoffs,
+        tracing,
+        *,
+        previous_response_id=None,
+    ):
+        """Stream the same output as get_response as a single completed event, so Runner.run_streamed works too"""
+        message, input_tokens, output_tokens = await self._respond(input, output_schema)
+        usage = ResponseUsage(
+            input_tokens=input_tokens,
+            input_tokens_details=InputTokensDetails(cached_tokens=0),
+            output_tokens=output_tokens,
+            output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+            total_tokens=input_tokens + output_tokens,
+        )
+        response = Response(
+            id="fake",
+            created_at=time.time(),
+            model="fake",
+            object="response",
+            output=[message],
+            parallel_tool_calls=False,
+            tool_choice="auto",
+            tools=[],
+            usage=usage,
+        )
+        yield ResponseCompletedEvent(response=response, sequence_number=0, type="response.completed")
+
+
+class FakeModelProvider(ModelProvider):
+    def __init__(self, model: FakeModel):
+        self.model = model
+
+    def get_model(self, model_name):
+        return self.model
+
+
+async def measure_loop_lag(samples: list[float], interval: float = 0.01) -> None:
+    """Record how late the event loop wakes a sleeping task, a proxy for blocking work"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))]
+
+
+async def benchmark(args) -> dict:
+    set_tracing_disabled(True)
+    email_dispatcher.transport = LocalTransport()
+    model = FakeModel(args.time_scale, args.jitter, args.error_rate, args.searches)
+    run_config = RunConfig(model_provider=FakeModelProvider(model), tracing_disabled=True)
+    limiter = ModelLimiter(args.max_calls, args.calls_per_second, args.max_calls)
+    scheduler = ResearchScheduler(max_jobs=args.max_jobs, max_queue=args.runs, limiter=limiter)
+    manager_options = {
+        "cache": None,
+        "checkpoints": None,
+        "metrics_dir": None,
+        "run_config": run_config,
+        "quorum": args.quorum if args.quorum < 1 else None,
+        "grace_period": GRACE_PERIOD * args.time_scale if args.grace_period is None else args.grace_period,
+    }
+
+    latencies = []
+    failures = 0
+    lag = []
+    lag_task = asyncio.create_task(measure_loop_lag(lag))
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def one_run(i: int) -> None:
+        nonlocal failures
+        async with gate:
+            start = time.perf_counter()
+            try:
+                async for _ in scheduler.run(f"user-{i % args.users}", f"benchmark topic {i}", **manager_options):
+                    pass
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_run(i) for i in range(args.runs)))
+    elapsed = time.perf_counter() - started
+    lag_task.cancel()
+    await email_dispatcher.flush()
+
+    return {
+        "runs": args.runs,
+        "completed": len(latencies),
+        "failed": failures,
+        "elapsed_seconds": elapsed,
+        "throughput_runs_per_second": len(latencies) / elapsed,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "loop_lag_p50_ms": percentile(lag, 50) * 1000,
+        "loop_lag_p99_ms": percentile(lag, 99) * 1000,
+        "loop_lag_max_ms": max(lag, default=0.0) * 1000,
+        "model_calls": model.calls,
+        "scheduler": scheduler.metrics(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="research runs to execute")
+    parser.add_argument("--concurrency", type=int, default=10, help="runs submitted at once")
+    parser.add_argument("--users", type=int, default=5, help="distinct users the runs are spread over")
+    parser.add_argument("--searches", type=int, default=5, help="searches planned per run")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="multiplier on the production-like latencies")
+    parser.add_argument("--jitter", type=float, default=0.5, help="sigma of the log-normal latency noise")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability a model call fails")
+    parser.add_argument("--quorum", type=float, default=QUORUM, help="fraction of searches that starts the grace period, 1 waits for all")
+    parser.add_argument("--grace-period", type=float, help="seconds stragglers get after the quorum, default scaled by --time-scale")
+    parser.add_argument("--max-jobs", type=int, default=4, help="scheduler concurrent runs")
+    parser.add_argument("--max-calls", type=int, default=8, help="model calls in flight")
+    parser.add_argument("--calls-per-second", type=float, default=1000.0, help="model call start rate")
+    args = parser.parse_args()
+
+    results = asyncio.run(benchmark(args))
+    for key, value in results.items():
+        print(f"{key:>28}: {value:.3f}" if isinstance(value, float) else f"{key:>28}: {value}")
+
+
+if __name__ == "__main__":
+    main()
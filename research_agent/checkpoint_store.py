@@ -0,0 +1,54 @@
+from pydantic import BaseModel
+from planner_agent import WebSearchPlan
+from research_agent import ReportData
+import os
+import re
+
+CHECKPOINT_DIR = "runs"
+
+STAGES = ["started", "planned", "searched", "reported", "emailed"]
+"""Run stages in order; a checkpoint records the last one completed"""
+
+
+class RunCheckpoint(BaseModel):
+    run_id: str
+    query: str
+    stage: str = "started"
+    plan: WebSearchPlan | None = None
+    searches: dict[str, str] = {}
+    """Search summaries keyed by the query that produced them"""
+
+    report: ReportData | None = None
+
+    def reached(self, stage: str) -> bool:
+        return STAGES.index(self.stage) >= STAGES.index(stage)
+
+
+class CheckpointStore:
+    """Stores each run's stage outputs as a JSON file so a failed run can be resumed"""
+
+    def __init__(self, directory: str = CHECKPOINT_DIR):
+        self.directory = directory
+
+    def _path(self, run_id: str) -> str:
+        if not re.fullmatch(r"[0-9a-f]{32}", run_id):
+            raise ValueError(f"Invalid run id: {run_id!r}")
+        return os.path.join(self.directory, f"{run_id}.json")
+
+    def load(self, run_id: str) -> RunCheckpoint | None:
+        try:
+            with open(self._path(run_id), "r", encoding="utf-8") as f:
+                return RunCheckpoint.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def save(self, checkpoint: RunCheckpoint) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(checkpoint.run_id)
+        # Write then rename so a crash mid-write never leaves a corrupt checkpoint
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(checkpoint.model_dump_json())
+        os.replace(f"{path}.tmp", path)
+
+
+checkpoint_store = CheckpointStore()
@@ -0,0 +1,52 @@
+import re
+from text_similarity import cosine, embed, same_specifics
+
+CONTEXT_TOKENS = 4000
+"""Default token budget for the search results handed to the report writer"""
+
+DUPLICATE_THRESHOLD = 0.97
+"""Sentences this similar to one already kept, with the same numbers and names, are dropped"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token count, about four characters per token for English text"""
+    return max(1, round(len(text) / 4))
+
+
+def split_sentences(text: str) -> list[str]:
+    sentences = re.split(r"(?<=[.!?])\s+|\n+", text)
+    return [sentence.strip() for sentence in sentences if sentence.strip()]
+
+
+def pack_context(query: str, summaries: list[str], budget: int = CONTEXT_TOKENS) -> str:
+    """Pack the most query-relevant, non-duplicate sentences of the summaries into the token budget"""
+    query_vector = embed(query)
+    candidates = []
+    kept = []
+    for source, summary in enumerate(summaries):
+        for position, sentence in enumerate(split_sentences(summary)):
+            vector = embed(sentence)
+            if any(
+                cosine(vector, kept_vector) >= DUPLICATE_THRESHOLD and same_specifics(sentence, kept_sentence)
+                for kept_sentence, kept_vector in kept
+            ):
+                continue
+            kept.append((sentence, vector))
+            # Summaries lead with their key facts, so earlier sentences get a small boost
+            score = cosine(query_vector, vector) + 0.1 / (1 + position)
+            candidates.append((score, source, position, sentence))
+
+    selected = []
+    used = 0
+    for score, source, position, sentence in sorted(candidates, key=lambda c: c[0], reverse=True):
+        tokens = estimate_tokens(sentence)
+        if used + tokens > budget:
+            continue
+        selected.append((source, position, sentence))
+        used += tokens
+
+    sections = []
+    for source in sorted({source for source, _, _ in selected}):
+        sentences = [sentence for s, _, sentence in sorted(selected) if s == source]
+        sections.append(f"Result {len(sections) + 1}:\n" + " ".join(sentences))
+    return "\n\n".join(sections)
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import random
+import httpx
+from instrumentation import registry
+
+POSTMARK_BATCH_URL = "https://api.postmarkapp.com/email/batch"
+FROM_EMAIL = "vietdo@umich.edu"  # Change to your verified sender
+TO_EMAIL = "vietdo@umich.edu"  # Change to your recipient
+
+BATCH_SIZE = 50
+"""Messages per Postmark batch call (Postmark accepts up to 500)"""
+
+BATCH_WINDOW = 0.5
+"""Seconds to wait for more messages before sending a partial batch"""
+
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+
+
+class DeliveryError(Exception):
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class PostmarkTransport:
+    """Sends batches through Postmark's batch endpoint over a pooled HTTP client"""
+
+    def __init__(self, server_token: str | None = None, url: str = POSTMARK_BATCH_URL):
+        self.server_token = server_token
+        self.url = url
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return self._client
+
+    async def send_batch(self, messages: list[dict]) -> None:
+        headers = {
+            "Accept": "application/json",
+            "X-Postmark-Server-Token": self.server_token or os.environ.get("POSTMARK_API_KEY", ""),
+        }
+        try:
+            response = await self._get_client().post(self.url, json=messages, headers=headers)
+        except httpx.TransportError as e:
+            raise DeliveryError(f"Postmark unreachable: {e}", retryable=True) from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise DeliveryError(f"Postmark returned {response.status_code}", retryable=True)
+        if response.status_code >= 400:
+            raise DeliveryError(f"Postmark rejected batch: {response.text}", retryable=False)
+        for message, result in zip(messages, response.json()):
+            if result.get("ErrorCode"):
+                print(f"Postmark rejected '{message['Subject']}': {result.get('Message')}")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LocalTransport:
+    """Stand-in transport that records batches in memory, optionally failing the first few sends"""
+
+    def __init__(self, fail_times: int = 0):
+        self.fail_times = fail_times
+        self.batches: list[list[dict]] = []
+
+    @property
+    def sent(self) -> list[dict]:
+        return [message for batch in self.batches for message in batch]
+
+    async def send_batch(self, messages: list[dict]) -> None:
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise DeliveryError("Simulated failure", retryable=True)
+        self.batches.append(list(messages))
+
+    async def aclose(self) -> None:
+        pass
+
+
+class EmailDispatcher:
+    """Outbound email queue drained by a background worker that sends in batches with retries"""
+
+    def __init__(
+        self,
+        transport=None,
+        batch_size: int = BATCH_SIZE,
+        batch_window: float = BATCH_WINDOW,
+        max_retries: int = MAX_RETRIES,
+        retry_base_delay: float = RETRY_BASE_DELAY,
+    ):
+        self.transport = transport or PostmarkTransport()
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self._queue = None
+        self._worker = None
+
+    def enqueue(self, subject: str, html_body: str, to: str = TO_EMAIL, sender: str = FROM_EMAIL) -> None:
+        """Queue an email for delivery and return immediately; must be called from the event loop"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        self._queue.put_nowait({"From": sender, "To": to, "Subject": subject, "HtmlBody": html_body})
+
+    async def flush(self) -> None:
+        """Wait until every queued email has been sent or given up on"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._send(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _send(self, batch: list[dict]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.transport.send_batch(batch)
+                self.sent += len(batch)
+                registry.inc("research_emails_total", len(batch), outcome="sent")
+                print(f"Sent {len(batch)} emails")
+                return
+            except DeliveryError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    self._give_up(batch, e)
+                    return
+                self.retries += 1
+                registry.inc("research_email_retries_total")
+                # Exponential backoff with full jitter so retries from many runs spread out
+                delay = random.uniform(0, self.retry_base_delay * 2**attempt)
+                print(f"Email delivery failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                # an unexpected error must not kill the worker and strand the emails queued behind it
+                self._give_up(batch, e)
+                return
+
+    def _give_up(self, batch: list[dict], error: Exception) -> None:
+        print(f"Giving up on {len(batch)} emails: {error}")
+        self.failed += len(batch)
+        registry.inc("research_emails_total", len(batch), outcome="failed")
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "failed": self.failed, "retries": self.retries}
+
+
+email_dispatcher = EmailDispatcher()
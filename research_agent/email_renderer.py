@@ -0,0 +1,157 @@
+from html import escape
+import re
+from research_agent import ReportData
+
+MAX_SUBJECT_LENGTH = 78
+
+STYLES = {
+    "body": "font-family: Helvetica, Arial, sans-serif; font-size: 15px; line-height: 1.6; color: #1f2933; max-width: 720px; margin: 0 auto; padding: 24px;",
+    "h1": "font-size: 26px; color: #0b6e99; margin: 24px 0 12px;",
+    "h2": "font-size: 21px; color: #0b6e99; margin: 22px 0 10px;",
+    "h3": "font-size: 18px; color: #1f2933; margin: 20px 0 8px;",
+    "h4": "font-size: 16px; color: #1f2933; margin: 18px 0 6px;",
+    "p": "margin: 0 0 14px;",
+    "ul": "margin: 0 0 14px; padding-left: 24px;",
+    "ol": "margin: 0 0 14px; padding-left: 24px;",
+    "blockquote": "margin: 0 0 14px; padding: 8px 16px; border-left: 4px solid #0b6e99; background: #f0f7fb;",
+    "pre": "margin: 0 0 14px; padding: 12px; background: #f4f5f7; border-radius: 4px; overflow-x: auto;",
+    "code": "font-family: Menlo, Consolas, monospace; font-size: 13px; background: #f4f5f7; padding: 1px 4px;",
+    "table": "border-collapse: collapse; margin: 0 0 14px;",
+    "cell": "border: 1px solid #d9e2ec; padding: 6px 10px; text-align: left;",
+    "summary": "margin: 0 0 20px; padding: 12px 16px; background: #f0f7fb; border-radius: 4px;",
+}
+
+
+def render_inline(text: str) -> str:
+    """Escape the text and render inline code, links, bold and italics"""
+    codes = []
+    links = []
+
+    def stash_code(match):
+        codes.append(f'<code style="{STYLES["code"]}">{escape(match.group(1))}</code>')
+        return f"\x00{len(codes) - 1}\x00"
+
+    # Links are rendered from the raw URL and set aside, so the URL is escaped exactly once
+    # and the emphasis rules below can't reach inside the href
+    def stash_link(match):
+        links.append(f'<a href="{escape(match.group(2))}" style="color: #0b6e99;">{escape(match.group(1), quote=False)}</a>')
+        return f"\x01{len(links) - 1}\x01"
+
+    text = re.sub(r"`([^`]+)`", stash_code, text)
+    text = re.sub(r"\[([^\]]+)\]\(([^)\s]+)\)", stash_link, text)
+    text = escape(text, quote=False)
+    text = re.sub(r"\*\*(.+?)\*\*|__(.+?)__", lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+    text = re.sub(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?!\w)|(?<!\w)_(?!\s)(.+?)(?<!\s)_(?!\w)", lambda m: f"<em>{m.group(1) or m.group(2)}</em>", text)
+    text = re.sub(r"\x01(\d+)\x01", lambda m: links[int(m.group(1))], text)
+    return re.sub(r"\x00(\d+)\x00", lambda m: codes[int(m.group(1))], text)
+
+
+def split_row(line: str) -> list[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def render_markdown(markdown: str) -> str:
+    """Convert the Markdown produced by the research agent to inline-styled HTML"""
+    lines = markdown.splitlines()
+    html = []
+    paragraph = []
+    i = 0
+
+    def flush_paragraph():
+        if paragraph:
+            html.append(f'<p style="{STYLES["p"]}">{render_inline(" ".join(paragraph))}</p>')
+            paragraph.clear()
+
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        heading = re.match(r"(#{1,6})\s+(.*?)\s*#*$", stripped)
+        list_item = re.match(r"([-*+]|\d+[.)])\s+(.*)", stripped)
+
+        if not stripped:
+            flush_paragraph()
+            i += 1
+        elif stripped.startswith("```"):
+            flush_paragraph()
+            block = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith("```"):
+                block.append(lines[i])
+                i += 1
+            html.append(f'<pre style="{STYLES["pre"]}"><code>{escape(chr(10).join(block))}</code></pre>')
+            i += 1
+        elif heading:
+            flush_paragraph()
+            tag = f"h{min(len(heading.group(1)), 4)}"
+            html.append(f'<{tag} style="{STYLES[tag]}">{render_inline(heading.group(2))}</{tag}>')
+            i += 1
+        elif re.fullmatch(r"([-*_])(\s*\1){2,}", stripped):
+            flush_paragraph()
+            html.append('<hr style="border: none; border-top: 1px solid #d9e2ec; margin: 20px 0;">')
+            i += 1
+        elif stripped.startswith(">"):
+            flush_paragraph()
+            quote = []
+            while i < len(lines) and lines[i].strip().startswith(">"):
+                quote.append(lines[i].strip()[1:].strip())
+                i += 1
+            html.append(f'<blockquote style="{STYLES["blockquote"]}">{render_inline(" ".join(quote))}</blockquote>')
+        elif stripped.startswith("|") and i + 1 < len(lines) and re.fullmatch(r"\|?[\s:|-]+\|?", lines[i + 1].strip()):
+            flush_paragraph()
+            header = split_row(stripped)
+            i += 2
+            rows = []
+            while i < len(lines) and lines[i].strip().startswith("|"):
+                rows.append(split_row(lines[i]))
+                i += 1
+            head = "".join(f'<th style="{STYLES["cell"]}">{render_inline(cell)}</th>' for cell in header)
+            body = "".join(
+                "<tr>" + "".join(f'<td style="{STYLES["cell"]}">{render_inline(cell)}</td>' for cell in row) + "</tr>"
+                for row in rows
+            )
+            html.append(f'<table style="{STYLES["table"]}"><tr>{head}</tr>{body}</table>')
+        elif list_item:
+            flush_paragraph()
+            tag = "ul" if list_item.group(1) in "-*+" else "ol"
+            items = []
+            while i < len(lines):
+                item = re.match(r"\s*([-*+]|\d+[.)])\s+(.*)", lines[i])
+                if item and (item.group(1) in "-*+") == (tag == "ul"):
+                    items.append(item.group(2))
+                elif lines[i].strip() and lines[i].startswith((" ", "\t")) and items:
+                    items[-1] += " " + lines[i].strip()
+                else:
+                    break
+                i += 1
+            body = "".join(f"<li>{render_inline(item)}</li>" for item in items)
+            html.append(f'<{tag} style="{STYLES[tag]}">{body}</{tag}>')
+        else:
+            paragraph.append(stripped)
+            i += 1
+    flush_paragraph()
+    return "\n".join(html)
+
+
+def make_subject(short_summary: str) -> str:
+    """Use the first sentence of the summary as the subject, trimmed at a word boundary"""
+    sentence = re.split(r"(?<=[.!?])\s", short_summary.strip(), maxsplit=1)[0].rstrip(".")
+    if len(sentence) <= MAX_SUBJECT_LENGTH:
+        return sentence or "Your research report"
+    return sentence[: MAX_SUBJECT_LENGTH - 1].rsplit(" ", 1)[0] + "…"
+
+
+def render_report_email(report: ReportData) -> tuple[str, str]:
+    """Render the report as an email, returning the subject and HTML body"""
+    follow_ups = "".join(f"<li>{render_inline(question)}</li>" for question in report.follow_up_questions)
+    html_body = (
+        f'<div style="{STYLES["body"]}">'
+        f'<div style="{STYLES["summary"]}"><strong>Summary.</strong> {render_inline(report.short_summary)}</div>'
+        f"{render_markdown(report.markdown_report)}"
+    )
+    if follow_ups:
+        html_body += (
+            f'<h3 style="{STYLES["h3"]}">Follow-up questions</h3>'
+            f'<ul style="{STYLES["ul"]}">{follow_ups}</ul>'
+        )
+    html_body += "</div>"
+    return make_subject(report.short_summary), html_body
@@ -0,0 +1,162 @@
+from collections import defaultdict
+from contextlib import contextmanager
+import json
+import os
+import time
+
+METRICS_DIR = "runs"
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, float("inf"))
+
+listeners = []
+"""Callables receiving every run event as a dict"""
+
+
+def add_listener(listener) -> None:
+    listeners.append(listener)
+
+
+class MetricsRegistry:
+    """Process-wide Prometheus-style counters and histograms"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counters = defaultdict(float)
+        self.histograms = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        self.counters[self._key(name, labels)] += value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self._key(name, labels)
+        if key not in self.histograms:
+            self.histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        histogram = self.histograms[key]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+
+        def format_labels(labels, extra=()):
+            pairs = [f'{k}="{v}"' for k, v in (*labels, *extra)]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines = []
+        for (name, labels), value in sorted(self.counters.items()):
+            lines.append(f"{name}{format_labels(labels)} {value:g}")
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{name}_bucket{format_labels(labels, [('le', le)])} {count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {histogram['sum']:g}")
+            lines.append(f"{name}_count{format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class RunMetrics:
+    """Timings, token usage and cache results for one research run"""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.started = time.time()
+        self.outcome = "running"
+        self.events = []
+        self.stages = {}
+        self.searches = []
+        self.agents = defaultdict(
+            lambda: {
+                "calls": 0,
+                "seconds": 0.0,
+                "queued_seconds": 0.0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "requests": 0,
+                "errors": 0,
+            }
+        )
+        self.cache = {"hits": 0, "misses": 0}
+        registry.inc("research_runs_total")
+
+    def emit(self, event: str, **fields) -> None:
+        record = {"event": event, "run_id": self.run_id, "time": time.time(), **fields}
+        self.events.append(record)
+        for listener in listeners:
+            listener(record)
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        self.emit("stage_started", stage=name)
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            registry.observe("research_stage_seconds", seconds, stage=name)
+            self.emit("stage_finished", stage=name, seconds=seconds)
+
+    def record_agent_call(self, agent: str, seconds: float, queued: float, usage=None, error: bool = False) -> None:
+        stats = self.agents[agent]
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        stats["queued_seconds"] += queued
+        stats["errors"] += int(error)
+        registry.observe("research_agent_call_seconds", seconds, agent=agent)
+        registry.observe("research_agent_queued_seconds", queued, agent=agent)
+        if error:
+            registry.inc("research_agent_errors_total", agent=agent)
+        if usage is not None:
+            stats["input_tokens"] += usage.input_tokens
+            stats["output_tokens"] += usage.output_tokens
+            stats["requests"] += usage.requests
+            registry.inc("research_tokens_total", usage.input_tokens, agent=agent, kind="input")
+            registry.inc("research_tokens_total", usage.output_tokens, agent=agent, kind="output")
+        self.emit("agent_call", agent=agent, seconds=seconds, queued_seconds=queued, error=error)
+
+    def record_search(self, query: str, seconds: float, outcome: str) -> None:
+        """Outcome is one of cache_hit, ok, timeout, dropped or error"""
+        self.searches.append({"query": query, "seconds": seconds, "outcome": outcome})
+        if outcome == "cache_hit":
+            self.cache["hits"] += 1
+        else:
+            self.cache["misses"] += 1
+        registry.observe("research_search_seconds", seconds, outcome=outcome)
+        registry.inc("research_searches_total", outcome=outcome)
+        self.emit("search", query=query, seconds=seconds, outcome=outcome)
+
+    def summary(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "outcome": self.outcome,
+            "total_seconds": time.time() - self.started,
+            "stages": self.stages,
+            "searches": self.searches,
+            "agents": dict(self.agents),
+            "cache": self.cache,
+            "input_tokens": sum(a["input_tokens"] for a in self.agents.values()),
+            "output_tokens": sum(a["output_tokens"] for a in self.agents.values()),
+        }
+
+    def finish(self, outcome: str) -> None:
+        self.outcome = outcome
+        registry.inc("research_run_outcomes_total", outcome=outcome)
+        self.emit("run_finished", outcome=outcome)
+
+    def export(self, directory: str = METRICS_DIR) -> str:
+        """Write the run summary as JSON and return its path"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.run_id}.metrics.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
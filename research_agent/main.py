@@ -1,22 +1,29 @@
 import gradio as gr
 from dotenv import load_dotenv
-from research_manager import ResearchManager
+from scheduler import ResearchScheduler, SchedulerBusy
 
 load_dotenv(override=True)
 
-async def run(query: str):
-    async for chunk in ResearchManager().run(query):
-        yield chunk
+scheduler = ResearchScheduler()
+
+
+async def run(query: str, run_id: str, request: gr.Request):
+    try:
+        async for chunk in scheduler.run(request.session_hash, query, run_id.strip() or None):
+            yield chunk
+    except SchedulerBusy:
+        yield "The research queue is full right now, please try again in a minute."
 
 
 with gr.Blocks(theme=gr.themes.Default(primary_hue="sky")) as ui:
     gr.Markdown("# Bach Do's Agenetic AI Research App")
     query_textbox = gr.Textbox(label="Hello, what topic would you like to research?")
+    run_id_textbox = gr.Textbox(label="Run id to resume (optional)")
     run_button = gr.Button("✨ Run ✨", variant="huggingface")
     report = gr.Markdown(label="Report")
     
-    run_button.click(fn=run, inputs=query_textbox, outputs=report)
-    query_textbox.submit(fn=run, inputs=query_textbox, outputs=report)
+    # Admission is handled by the scheduler, so let Gradio hand over every request
+    run_button.click(fn=run, inputs=[query_textbox, run_id_textbox], outputs=report, concurrency_limit=None)
+    query_textbox.submit(fn=run, inputs=[query_textbox, run_id_textbox], outputs=report, concurrency_limit=None)
 
 ui.launch(inbrowser=True)
-
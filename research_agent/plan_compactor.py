@@ -0,0 +1,27 @@
+from planner_agent import WebSearchPlan, WebSearchQuery
+from text_similarity import same_specifics, similarity
+
+SIMILARITY_THRESHOLD = 0.8
+"""Queries at least this similar to an earlier one, with the same numbers and names, are merged into it"""
+
+
+def compact_plan(
+    plan: WebSearchPlan, threshold: float = SIMILARITY_THRESHOLD
+) -> tuple[WebSearchPlan, int]:
+    """Merge near-duplicate queries in the plan, returning the compacted plan and the number of searches saved"""
+    clusters: list[list[WebSearchQuery]] = []
+    for item in plan.searches:
+        for cluster in clusters:
+            first = cluster[0].query
+            if same_specifics(first, item.query) and similarity(first, item.query) >= threshold:
+                cluster.append(item)
+                break
+        else:
+            clusters.append([item])
+
+    searches = []
+    for cluster in clusters:
+        # Keep the planner's first phrasing, but carry over every reason for the search
+        reasons = list(dict.fromkeys(item.reason for item in cluster))
+        searches.append(WebSearchQuery(reason="; ".join(reasons), query=cluster[0].query))
+    return WebSearchPlan(searches=searches), len(plan.searches) - len(searches)
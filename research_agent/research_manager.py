@@ -1,88 +1,292 @@
-from agents import Runner, trace, gen_trace_id
+from agents import Runner, RunConfig, trace, gen_trace_id
 from search_agent import search_agent
 from planner_agent import planner_agent, WebSearchPlan, WebSearchQuery
 from research_agent import research_agent, ReportData
 from email_agent import email_agent
+from email_delivery import email_dispatcher
+from email_renderer import render_report_email
+from search_cache import SearchCache, search_cache
+from plan_compactor import compact_plan, SIMILARITY_THRESHOLD
+from context_packer import pack_context, CONTEXT_TOKENS
+from checkpoint_store import CheckpointStore, RunCheckpoint, checkpoint_store
+from instrumentation import RunMetrics, METRICS_DIR
+from contextlib import nullcontext
 import asyncio
+import math
+import time
+import uuid
+
+SEARCH_TIMEOUT = 60
+"""Seconds a single search may run before it is dropped from the report"""
+
+QUORUM = 0.8
+"""Fraction of the planned searches that must land before the stragglers are put on GRACE_PERIOD"""
+
+GRACE_PERIOD = 10.0
+"""Seconds the remaining searches get once the quorum is in; the report is written without any still running"""
+
+pending_emails: set[asyncio.Task] = set()
+"""Emails still being composed, kept referenced until they finish"""
 
 
 class ResearchManager:
 
-    async def run(self, query: str):
-        """Run the deep research process, yielding the status updates and the final report"""
+    def __init__(
+        self,
+        search_timeout: float = SEARCH_TIMEOUT,
+        quorum: float | None = QUORUM,
+        grace_period: float = GRACE_PERIOD,
+        cache: SearchCache | None = search_cache,
+        limiter=None,
+        similarity_threshold: float | None = SIMILARITY_THRESHOLD,
+        email_mode: str = "local",
+        checkpoints: CheckpointStore | None = checkpoint_store,
+        context_tokens: int = CONTEXT_TOKENS,
+        metrics_dir: str | None = METRICS_DIR,
+        run_config: RunConfig | None = None,
+    ):
+        self.search_timeout = search_timeout
+        self.quorum = quorum
+        self.grace_period = grace_period
+        self.cache = cache
+        self.limiter = limiter
+        self.similarity_threshold = similarity_threshold
+        self.email_mode = email_mode
+        self.checkpoints = checkpoints
+        self.context_tokens = context_tokens
+        self.metrics_dir = metrics_dir
+        self.run_config = run_config
+        self.metrics = None
+
+    async def run(self, query: str, run_id: str | None = None):
+        """Run the deep research process, yielding the status updates and the final report.
+        Stages already recorded in the run's checkpoint are skipped."""
+        run_id = run_id or uuid.uuid4().hex
+        self.metrics = RunMetrics(run_id)
+        checkpoint = None
+        if self.checkpoints is not None:
+            checkpoint = self.checkpoints.load(run_id)
+        checkpoint = checkpoint or RunCheckpoint(run_id=run_id, query=query)
+        query = checkpoint.query
         trace_id = gen_trace_id()
+
+        def status(message: str) -> str:
+            # The run id rides along with every update so it is still on screen if the run fails
+            return f"{message}\n\nRun id: `{run_id}`"
+
         with trace("Research trace", trace_id=trace_id):
             print(
                 f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}"
             )
-            yield f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}"
-            print("Starting research...")
-            search_plan = await self.plan_searches(query)
-            yield "Searches planned, starting to search..."
-            search_results = await self.perform_searches(search_plan)
-            yield "Searches complete, writing report..."
-            report = await self.write_report(query, search_results)
-            yield "Report written, sending email..."
-            await self.send_email(report)
-            yield "Email sent, research complete"
+            print(f"Run id: {run_id}")
+            yield status(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
+            outcome = "cancelled"
+            try:
+                print("Starting research...")
+                self.metrics.emit("run_started", query=query, resumed_from=checkpoint.stage)
+                if not checkpoint.reached("planned"):
+                    with self.metrics.stage("plan"):
+                        search_plan = await self.plan_searches(query)
+                        if self.similarity_threshold is not None:
+                            search_plan, saved = compact_plan(search_plan, self.similarity_threshold)
+                            print(f"Merged near-duplicate queries, saved {saved} searches")
+                            self.metrics.emit("plan_compacted", saved=saved)
+                    checkpoint.plan = search_plan
+                    self.save_checkpoint(checkpoint, "planned")
+                search_plan = checkpoint.plan
+                yield status("Searches planned, starting to search...")
+
+                if not checkpoint.reached("searched"):
+                    def on_result(item: WebSearchQuery, results: list[str]) -> None:
+                        checkpoint.searches[item.query] = results[-1]
+                        self.save_checkpoint(checkpoint)
+
+                    remaining = [item for item in search_plan.searches if item.query not in checkpoint.searches]
+                    with self.metrics.stage("search"):
+                        await self.perform_searches(
+                            WebSearchPlan(searches=remaining), on_result, list(checkpoint.searches.values())
+                        )
+                    self.save_checkpoint(checkpoint, "searched")
+                yield status("Searches complete, writing report...")
+
+                if not checkpoint.reached("reported"):
+                    with self.metrics.stage("report"):
+                        checkpoint.report = await self.write_report(query, list(checkpoint.searches.values()))
+                    self.save_checkpoint(checkpoint, "reported")
+                report = checkpoint.report
+                yield status("Report written, sending email...")
+
+                if not checkpoint.reached("emailed"):
+                    with self.metrics.stage("email"):
+                        await self.send_email(report)
+                    self.save_checkpoint(checkpoint, "emailed")
+                outcome = "completed"
+            except Exception as e:
+                outcome = "failed"
+                print(f"Run {run_id} failed: {e}")
+                yield status(f"Research failed: {e}. Paste the run id into 'Run id to resume' to continue where it stopped.")
+                raise
+            finally:
+                # Failed and cancelled runs are the ones worth looking at, so they are exported too
+                self.metrics.finish(outcome)
+                if self.metrics_dir is not None:
+                    print(f"Run metrics written to {self.metrics.export(self.metrics_dir)}")
+            yield status("Email queued, research complete")
             yield report.markdown_report
 
+    async def resume(self, run_id: str):
+        """Resume a run from its last completed stage"""
+        try:
+            checkpoint = self.checkpoints.load(run_id) if self.checkpoints is not None else None
+        except ValueError:
+            checkpoint = None
+        if checkpoint is None:
+            yield f"No checkpoint found for run {run_id}"
+            return
+        async for chunk in self.run(checkpoint.query, run_id):
+            yield chunk
+
+    def save_checkpoint(self, checkpoint: RunCheckpoint, stage: str | None = None) -> None:
+        if stage is not None:
+            checkpoint.stage = stage
+        if self.checkpoints is not None:
+            self.checkpoints.save(checkpoint)
+
+    async def run_agent(self, agent, input: str, timeout: float | None = None):
+        """Run an agent, holding a slot in the shared model limiter if there is one.
+        The timeout only counts time spent running, not time queued for a slot."""
+        queued_at = time.perf_counter()
+        async with self.limiter.slot() if self.limiter else nullcontext():
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(
+                    Runner.run(agent, input, run_config=self.run_config), timeout=timeout
+                )
+            except Exception:
+                self.record_agent_call(agent, queued_at, started, error=True)
+                raise
+            self.record_agent_call(agent, queued_at, started, result.context_wrapper.usage)
+            return result
+
+    def record_agent_call(self, agent, queued_at: float, started: float, usage=None, error: bool = False) -> None:
+        if self.metrics is not None:
+            self.metrics.record_agent_call(
+                agent.name, time.perf_counter() - started, started - queued_at, usage, error
+            )
+
     async def plan_searches(self, query: str) -> WebSearchPlan:
         """Plan the searches to perform for the query"""
         print("Planning searches...")
-        result = await Runner.run(
-            planner_agent,
-            f"Query: {query}",
-        )
+        result = await self.run_agent(planner_agent, f"Query: {query}")
         print(f"Will perform {len(result.final_output.searches)} searches")
         return result.final_output_as(WebSearchPlan)
 
-    async def perform_searches(self, search_plan: WebSearchPlan) -> list[str]:
-        """Perform the searches to perform for the query"""
+    async def perform_searches(
+        self, search_plan: WebSearchPlan, on_result=None, results: list[str] | None = None
+    ) -> list[str]:
+        """Perform the searches to perform for the query, calling on_result as each summary lands.
+        Summaries from earlier attempts can be passed in as results. Once a quorum of the searches
+        has landed, the rest get grace_period seconds before they are cancelled."""
         print("Searching...")
         num_completed = 0
+        results = list(results or [])
+
+        async def search(item: WebSearchQuery) -> tuple[WebSearchQuery, str | None]:
+            return item, await self.search(item)
+
         tasks = [
-            asyncio.create_task(self.search(item)) for item in search_plan.searches
+            asyncio.create_task(search(item)) for item in search_plan.searches
         ]
-        results = []
-        for task in asyncio.as_completed(tasks):
-            result = await task
-            if result is not None:
-                results.append(result)
-            num_completed += 1
-            print(f"Searching... {num_completed}/{len(tasks)} completed")
+        total = len(results) + len(tasks)
+        quorum = math.ceil(self.quorum * total) if self.quorum is not None else total
+        loop = asyncio.get_running_loop()
+        deadline = None
+        pending = set(tasks)
+        try:
+            while pending:
+                if deadline is None and len(results) >= quorum:
+                    deadline = loop.time() + self.grace_period
+                    print(f"Quorum of {quorum}/{total} reached, waiting {self.grace_period}s for the rest")
+                timeout = None if deadline is None else max(0, deadline - loop.time())
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"Grace period over, dropping {len(pending)} searches")
+                    break
+                for task in done:
+                    item, result = task.result()
+                    if result is not None:
+                        results.append(result)
+                        if on_result is not None:
+                            on_result(item, results)
+                    num_completed += 1
+                    print(f"Searching... {num_completed}/{len(tasks)} completed")
+        finally:
+            for task in pending:
+                task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
         print("Finished searching")
+        if self.cache is not None:
+            print(f"Search cache: {self.cache.stats()}")
         return results
 
     async def search(self, item: WebSearchQuery) -> str | None:
-        """Perform a search for the query"""
+        """Perform a search for the query, giving up once the search deadline passes"""
+        started = time.perf_counter()
+        if self.cache is not None:
+            cached = self.cache.get(item.query)
+            if cached is not None:
+                print(f"Cache hit for '{item.query}'")
+                self.record_search(item, started, "cache_hit")
+                return cached
         input = f"Search term: {item.query}\nReason for searching: {item.reason}"
         try:
-            result = await Runner.run(
-                search_agent,
-                input,
-            )
-            return str(result.final_output)
+            result = await self.run_agent(search_agent, input, timeout=self.search_timeout)
+            summary = str(result.final_output)
+            if self.cache is not None:
+                self.cache.put(item.query, summary)
+            self.record_search(item, started, "ok")
+            return summary
+        except asyncio.TimeoutError:
+            print(f"Dropping search '{item.query}' after {self.search_timeout}s")
+            self.record_search(item, started, "timeout")
+            return None
+        except asyncio.CancelledError:
+            self.record_search(item, started, "dropped")
+            raise
         except Exception:
+            self.record_search(item, started, "error")
             return None
 
+    def record_search(self, item: WebSearchQuery, started: float, outcome: str) -> None:
+        if self.metrics is not None:
+            self.metrics.record_search(item.query, time.perf_counter() - started, outcome)
+
     async def write_report(self, query: str, search_results: list[str]) -> ReportData:
-        """Write the report for the query"""
+        """Write the report for the query from all search results"""
         print("Thinking about report...")
-        input = f"Original query: {query}\nSummarized search results: {search_results}"
-        result = await Runner.run(
-            research_agent,
-            input,
-        )
+        context = pack_context(query, search_results, self.context_tokens)
+        input = f"Original query: {query}\nSummarized search results:\n{context}"
+        result = await self.run_agent(research_agent, input)
 
         print("Finished writing report")
         return result.final_output_as(ReportData)
 
     async def send_email(self, report: ReportData) -> None:
+        """Queue the report email; with email_mode="agent" the email agent writes it in the background"""
+        if self.email_mode == "local":
+            subject, html_body = render_report_email(report)
+            email_dispatcher.enqueue(subject, html_body)
+            print("Email queued")
+            return
         print("Writing email...")
-        result = await Runner.run(
-            email_agent,
-            report.markdown_report,
-        )
-        print("Email sent")
-        return report
+        task = asyncio.create_task(self.compose_email(report))
+        pending_emails.add(task)
+        task.add_done_callback(pending_emails.discard)
+
+    async def compose_email(self, report: ReportData) -> None:
+        try:
+            await self.run_agent(email_agent, report.markdown_report)
+            print("Email queued")
+        except Exception as e:
+            print(f"Failed to write email: {e}")
@@ -0,0 +1,174 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from research_manager import ResearchManager
+import asyncio
+import time
+
+MAX_CONCURRENT_JOBS = 4
+"""Research runs allowed to execute at once across all users"""
+
+MAX_QUEUED_JOBS = 32
+"""Runs allowed to wait for a slot before new submissions are rejected"""
+
+MAX_CONCURRENT_CALLS = 8
+"""Model calls allowed in flight at once across all runs"""
+
+CALLS_PER_SECOND = 2.0
+CALL_BURST = 8
+
+
+class SchedulerBusy(Exception):
+    """Raised when the research queue is full and a job cannot be accepted"""
+
+
+class TokenBucket:
+    """Async token bucket that refills at a fixed rate up to a burst capacity"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ModelLimiter:
+    """Caps in-flight model calls and their start rate, shared by every research run"""
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENT_CALLS,
+        rate: float = CALLS_PER_SECOND,
+        burst: int = CALL_BURST,
+    ):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.in_flight = 0
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            await self.bucket.acquire()
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+        finally:
+            self.semaphore.release()
+
+
+class ResearchScheduler:
+    """Admits research runs in round-robin order across users, behind a shared model limiter"""
+
+    def __init__(
+        self,
+        max_jobs: int = MAX_CONCURRENT_JOBS,
+        max_queue: int = MAX_QUEUED_JOBS,
+        limiter: ModelLimiter | None = None,
+    ):
+        self.max_jobs = max_jobs
+        self.max_queue = max_queue
+        self.limiter = limiter or ModelLimiter()
+        self.running = 0
+        self.queues: dict[str, deque[asyncio.Future]] = {}
+        self.order: deque[str] = deque()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.total_wait = 0.0
+
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def metrics(self) -> dict:
+        admitted = self.submitted - self.rejected - self.queue_depth()
+        return {
+            "running": self.running,
+            "queued": self.queue_depth(),
+            "queued_users": len(self.order),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "avg_wait_seconds": self.total_wait / admitted if admitted else 0.0,
+            "model_calls_in_flight": self.limiter.in_flight,
+            "model_calls_waiting": self.limiter.waiting,
+        }
+
+    async def _acquire(self, user_id: str) -> None:
+        self.submitted += 1
+        if self.running < self.max_jobs and not self.order:
+            self.running += 1
+            return
+        if self.queue_depth() >= self.max_queue:
+            self.rejected += 1
+            raise SchedulerBusy(f"{self.queue_depth()} research jobs already queued")
+        future = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(user_id, deque()).append(future)
+        if user_id not in self.order:
+            self.order.append(user_id)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled, pass it on
+                self._release()
+            else:
+                self._discard(user_id, future)
+            raise
+
+    def _discard(self, user_id: str, future: asyncio.Future) -> None:
+        queue = self.queues.get(user_id)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        if not queue:
+            del self.queues[user_id]
+            self.order.remove(user_id)
+
+    def _release(self) -> None:
+        """Hand the freed slot to the next user in round-robin order"""
+        while self.order:
+            user_id = self.order.popleft()
+            queue = self.queues[user_id]
+            future = queue.popleft()
+            if queue:
+                self.order.append(user_id)
+            else:
+                del self.queues[user_id]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
+
+    async def run(self, user_id: str, query: str, run_id: str | None = None, **kwargs):
+        """Queue a research run for the user, yielding its status updates once admitted.
+        Given a run_id, the run resumes from its checkpoint instead."""
+        queued_at = time.monotonic()
+        await self._acquire(user_id)
+        self.total_wait += time.monotonic() - queued_at
+        try:
+            manager = ResearchManager(limiter=self.limiter, **kwargs)
+            chunks = manager.resume(run_id) if run_id else manager.run(query)
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            self.completed += 1
+            self._release()
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import threading
+import time
+from text_similarity import tokenize
+
+CACHE_PATH = "cache/search_cache.db"
+CACHE_TTL = 6 * 60 * 60
+"""Seconds a cached search summary stays fresh"""
+
+CACHE_MAX_ENTRIES = 2000
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+
+def normalize_query(query: str) -> str:
+    """Normalize case, punctuation and stopwords, keeping word order so "paris to london" and "london to paris" differ"""
+    return " ".join(tokenize(query))
+
+
+class SearchCache:
+    """SQLite backed cache of search summaries with TTL and LRU eviction"""
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: float = CACHE_TTL,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS searches (
+                    key TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )"""
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS searches_accessed ON searches (accessed)")
+        return self._db
+
+    def get(self, query: str) -> str | None:
+        """Return the cached summary for the query, or None on a miss"""
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT result, created FROM searches WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    db.execute("DELETE FROM searches WHERE key = ?", (key,))
+                    db.commit()
+                self.misses += 1
+                return None
+            db.execute("UPDATE searches SET accessed = ? WHERE key = ?", (now, key))
+            db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, query: str, result: str) -> None:
+        """Store a search summary and evict the least recently used entries over the limits"""
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query, result, len(result.encode("utf-8")), now, now),
+            )
+            self._evict(db, now)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        db.execute("DELETE FROM searches WHERE created < ?", (now - self.ttl,))
+        count, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM searches").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+        rows = db.execute("SELECT key, size FROM searches ORDER BY accessed").fetchall()
+        for key, entry_size in rows:
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            db.execute("DELETE FROM searches WHERE key = ?", (key,))
+            count -= 1
+            size -= entry_size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters for the lifetime of this process"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+search_cache = SearchCache()
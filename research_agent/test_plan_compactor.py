@@ -0,0 +1,32 @@
+from planner_agent import WebSearchPlan, WebSearchQuery
+from plan_compactor import compact_plan
+
+
+def plan(*queries):
+    return WebSearchPlan(searches=[WebSearchQuery(reason=f"reason {i}", query=q) for i, q in enumerate(queries)])
+
+
+def test_entity_swaps_are_not_merged():
+    compacted, saved = compact_plan(
+        plan(
+            "Nvidia stock price forecast 2025",
+            "AMD stock price forecast 2025",
+            "OpenAI latest funding round",
+            "Anthropic latest funding round",
+        )
+    )
+    assert saved == 0
+    assert len(compacted.searches) == 4
+
+
+def test_year_swaps_are_not_merged():
+    compacted, saved = compact_plan(plan("Tesla Q3 2024 earnings", "Tesla Q3 2023 earnings"))
+    assert saved == 0
+    assert [s.query for s in compacted.searches] == ["Tesla Q3 2024 earnings", "Tesla Q3 2023 earnings"]
+
+
+def test_rephrasings_are_merged():
+    compacted, saved = compact_plan(plan("Tesla Q3 2024 earnings", "Tesla Q3 2024 earnings results"))
+    assert saved == 1
+    assert compacted.searches[0].query == "Tesla Q3 2024 earnings"
+    assert compacted.searches[0].reason == "reason 0; reason 1"
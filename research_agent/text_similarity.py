@@ -0,0 +1,60 @@
+from collections import Counter
+import math
+import re
+
+STOPWORDS = {"a", "an", "the", "of", "for", "in", "on", "and", "or", "to", "with", "about", "is", "are"}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens with stopwords removed"""
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+
+def numbers(text: str) -> set[str]:
+    return set(re.findall(r"\d+(?:[.,]\d+)*", text))
+
+
+def same_specifics(a: str, b: str) -> bool:
+    """True when the texts quote the same numbers and neither names something the other doesn't mention.
+
+    Trigram similarity can't tell "Nvidia ... 2025" from "AMD ... 2024"; those differ exactly in
+    their numbers and capitalized names, so text that differs there is never treated as a duplicate.
+    """
+    if numbers(a) != numbers(b):
+        return False
+    words_a = set(re.findall(r"[a-z0-9]+", a.lower()))
+    words_b = set(re.findall(r"[a-z0-9]+", b.lower()))
+    for text, other_words in ((a, words_b), (b, words_a)):
+        for name in re.findall(r"\b[A-Z][A-Za-z0-9]*", text):
+            if name.lower() not in other_words:
+                return False
+    return True
+
+
+def jaccard(a: str, b: str) -> float:
+    """Overlap of the two texts' token sets"""
+    tokens_a, tokens_b = set(tokenize(a)), set(tokenize(b))
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+
+def embed(text: str) -> Counter:
+    """Sparse character trigram vector, a cheap local stand-in for a sentence embedding"""
+    grams = Counter()
+    for token in tokenize(text):
+        padded = f" {token} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[gram] for gram, count in a.items() if gram in b)
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
+
+
+def similarity(a: str, b: str) -> float:
+    """Blend of lexical overlap and trigram cosine, in [0, 1]"""
+    return (jaccard(a, b) + cosine(embed(a), embed(b))) / 2
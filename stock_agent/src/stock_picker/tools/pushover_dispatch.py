@@ -0,0 +1,191 @@
+"""Background Pushover notification dispatcher shared by the projects in this repo.
+
+push() queues the message and returns immediately. A worker thread coalesces bursts into a
+single notification, paces sends, and reuses one keep-alive HTTPS connection. Point
+PUSHOVER_URL at StubPushoverServer().url to exercise it without hitting Pushover.
+
+personally_you and stock_agent are deployed on their own, so each keeps a copy of this file.
+Edit it here and run vendor.py to refresh the copies.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import atexit
+import os
+import queue
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+PUSHOVER_URL = "https://api.pushover.net/1/messages.json"
+
+COALESCE_WINDOW = 2.0
+"""Seconds to keep collecting messages after the first one of a burst"""
+
+MIN_INTERVAL = 2.0
+"""Minimum seconds between two notifications"""
+
+MAX_MESSAGE_LENGTH = 1024
+"""Pushover truncates messages longer than this"""
+
+MAX_RETRIES = 3
+
+MAX_RETRY_AFTER = 60.0
+"""Longest Retry-After from a 429 the worker will honour before retrying"""
+
+
+def retry_delay(response, attempt):
+    """Seconds to wait before the next attempt: Retry-After on a 429, exponential backoff otherwise"""
+    if response is not None and response.status_code == 429:
+        try:
+            return min(float(response.headers["Retry-After"]), MAX_RETRY_AFTER)
+        except (KeyError, ValueError):
+            pass
+    return 2**attempt
+
+
+class PushoverDispatcher:
+    def __init__(
+        self,
+        url=None,
+        token=None,
+        user=None,
+        coalesce_window=COALESCE_WINDOW,
+        min_interval=MIN_INTERVAL,
+    ):
+        self.url = url
+        self.token = token
+        self.user = user
+        self.coalesce_window = coalesce_window
+        self.min_interval = min_interval
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.sent = 0
+        self.coalesced = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._last_sent = 0.0
+
+    def push(self, text):
+        """Queue a notification and return without waiting for Pushover"""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="pushover", daemon=True)
+                self._worker.start()
+        self._queue.put(text)
+
+    def flush(self, timeout=None):
+        """Block until every queued notification has been sent or dropped"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.coalesce_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.coalesced += len(batch) - 1
+                for message in self._pack(batch):
+                    self._send(message)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _pack(batch):
+        """Join a burst into as few messages as fit Pushover's length limit"""
+        messages = []
+        current = ""
+        for text in batch:
+            text = text[:MAX_MESSAGE_LENGTH]
+            if current and len(current) + 1 + len(text) > MAX_MESSAGE_LENGTH:
+                messages.append(current)
+                current = text
+            else:
+                current = f"{current}\n{text}" if current else text
+        return messages + [current]
+
+    def _send(self, message):
+        wait = self._last_sent + self.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        data = {
+            "token": self.token or os.getenv("PUSHOVER_TOKEN"),
+            "user": self.user or os.getenv("PUSHOVER_USER"),
+            "message": message,
+        }
+        url = self.url or os.getenv("PUSHOVER_URL", PUSHOVER_URL)
+        for attempt in range(MAX_RETRIES + 1):
+            response = None
+            try:
+                response = self.session.post(url, data=data, timeout=10)
+                self._last_sent = time.monotonic()
+                if response.status_code < 400:
+                    self.sent += 1
+                    return
+                if response.status_code != 429 and response.status_code < 500:
+                    print(f"Pushover rejected notification: {response.text}")
+                    break
+            except requests.RequestException as e:
+                print(f"Pushover unreachable: {e}")
+            if attempt < MAX_RETRIES:
+                time.sleep(retry_delay(response, attempt))
+        self.failed += 1
+
+
+class StubPushoverServer:
+    """Local stand-in for the Pushover API that records every message it receives"""
+
+    def __init__(self, port=0):
+        messages = self.messages = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+                messages.append({key: values[0] for key, values in parse_qs(body).items()})
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b'{"status":1}')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/1/messages.json"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+dispatcher = PushoverDispatcher()
+atexit.register(dispatcher.flush, 5)
+
+
+def push(text):
+    dispatcher.push(text)